@@ -0,0 +1,283 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import world as rules
+from waves import WaveScheduler, load_timeline
+from world import World, Inputs
+
+# Headless batch runs for balancing. Scripted bots play complete games on a
+# process pool; results come back a chunk of episodes at a time and are
+# rolled up into a summary table per policy.
+#
+#   python batch.py --episodes 2000 --policy aim dodge
+#   python batch.py --set ENEMY_SPAWN_RATE=0.5 --out runs.jsonl
+#
+# Episode seeds come from one base seed, so the same command gives the same
+# games no matter how many workers run it.
+
+EPISODE_SECONDS = 600
+CHUNK_SIZE = 16
+DT = 1 / rules.BASE_TICK_RATE
+
+
+def nearest(world, x, y):
+    best = None
+    best_d = math.inf
+    for enemy in world.enemies:
+        d = (enemy.x - x) ** 2 + (enemy.y - y) ** 2
+        if d < best_d:
+            best = enemy
+            best_d = d
+    if world.boss is not None:
+        boss = world.boss
+        if (boss.x - x) ** 2 + (boss.y - y) ** 2 < best_d:
+            best = boss
+    return best
+
+
+def aim_at(world, target):
+    return math.degrees(math.atan2(target.y - world.player_y, target.x - world.player_x))
+
+
+class IdlePolicy:
+    # stands in the middle and never shoots: a floor for survival time
+    def __init__(self, rng):
+        self.rng = rng
+
+    def act(self, world):
+        return Inputs()
+
+
+class RandomPolicy:
+    # holds a random direction for a while, sprays in a random direction
+    def __init__(self, rng):
+        self.rng = rng
+        self.hold = 0
+        self.inputs = Inputs()
+
+    def act(self, world):
+        if self.hold <= 0:
+            rng = self.rng
+            self.hold = rng.randint(10, 60)
+            self.inputs = Inputs(
+                up=rng.random() < 0.5, down=rng.random() < 0.5,
+                left=rng.random() < 0.5, right=rng.random() < 0.5,
+                shoot=True, angle=rng.uniform(0, 360))
+        self.hold -= 1
+        return self.inputs
+
+
+class AimPolicy:
+    # stands still and shoots at whatever is closest
+    def __init__(self, rng):
+        self.rng = rng
+
+    def act(self, world):
+        target = nearest(world, world.player_x, world.player_y)
+        if target is None:
+            return Inputs()
+        return Inputs(shoot=True, angle=aim_at(world, target))
+
+
+class DodgePolicy(AimPolicy):
+    # shoots like AimPolicy and backs away from anything within range
+    DANGER = 150
+
+    def act(self, world):
+        inputs = super().act(world)
+        target = nearest(world, world.player_x, world.player_y)
+        if target is not None:
+            dx = world.player_x - target.x
+            dy = world.player_y - target.y
+            if dx * dx + dy * dy < self.DANGER ** 2:
+                inputs.right = dx > 0
+                inputs.left = dx < 0
+                inputs.up = dy > 0
+                inputs.down = dy < 0
+        return inputs
+
+
+POLICIES = {
+    "idle": IdlePolicy,
+    "random": RandomPolicy,
+    "aim": AimPolicy,
+    "dodge": DodgePolicy,
+}
+
+
+def load_policy(name):
+    # a name from POLICIES, or "module:Class" for a bot living elsewhere
+    if name in POLICIES:
+        return POLICIES[name]
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"unknown policy {name!r}; use one of {sorted(POLICIES)} "
+                         "or module:Class")
+    return getattr(importlib.import_module(module), attr)
+
+
+def apply_overrides(overrides):
+    # balancing knobs are module constants in world.py; patch them in place
+    for name, value in overrides.items():
+        if not hasattr(rules, name):
+            raise ValueError(f"world.py has no constant {name}")
+        setattr(rules, name, value)
+
+
+def run_episode(policy_name, seed, max_seconds=EPISODE_SECONDS, timeline=None):
+    world = World(seed=seed)
+    if timeline is not None:
+        world.waves = WaveScheduler(timeline, seed)
+    policy = load_policy(policy_name)(random.Random(seed ^ 0x5EED))
+    max_ticks = int(max_seconds / DT)
+
+    ticks = 0
+    damage = 0
+    boss_kills = 0
+    boss_seen = False
+    # bullets can take health below zero without setting game_over, so
+    # treat either as the end of the game
+    while ticks < max_ticks and not world.game_over and world.health > 0:
+        had_boss = world.boss is not None
+        health = world.health
+        world.step(DT, policy.act(world))
+        ticks += 1
+        if world.health < health:
+            damage += health - world.health
+        if had_boss:
+            boss_seen = True
+            if world.boss is None:
+                boss_kills += 1
+
+    return {
+        "policy": policy_name,
+        "seed": seed,
+        "survival_time": ticks * DT,
+        "died": world.game_over or world.health <= 0,
+        "score": world.score,
+        "boss_seen": boss_seen,
+        "boss_kills": boss_kills,
+        "damage_taken": damage,
+    }
+
+
+def run_chunk(policy_name, seeds, max_seconds, overrides, waves_path):
+    apply_overrides(overrides)
+    timeline = load_timeline(waves_path) if waves_path else None
+    return [run_episode(policy_name, seed, max_seconds, timeline) for seed in seeds]
+
+
+def episode_seeds(base_seed, count):
+    return np.random.SeedSequence(base_seed).generate_state(count, dtype=np.uint64).tolist()
+
+
+def run_batch(policies, episodes, base_seed=0, workers=None, max_seconds=EPISODE_SECONDS,
+              overrides=None, chunk_size=CHUNK_SIZE, waves_path=None):
+    # yields each finished chunk (a list of episode results) as it arrives
+    overrides = overrides or {}
+    seeds = episode_seeds(base_seed, episodes)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_chunk, policy, seeds[i:i + chunk_size], max_seconds, overrides,
+                        waves_path)
+            for policy in policies
+            for i in range(0, episodes, chunk_size)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def summarize(results):
+    by_policy = {}
+    for result in results:
+        by_policy.setdefault(result["policy"], []).append(result)
+
+    summary = {}
+    for policy, runs in by_policy.items():
+        survival = [r["survival_time"] for r in runs]
+        scores = [r["score"] for r in runs]
+        summary[policy] = {
+            "episodes": len(runs),
+            "survival_mean": statistics.fmean(survival),
+            "survival_median": statistics.median(survival),
+            "died": sum(r["died"] for r in runs) / len(runs),
+            "score_mean": statistics.fmean(scores),
+            "score_max": max(scores),
+            "boss_reached": sum(r["boss_seen"] for r in runs) / len(runs),
+            "boss_killed": sum(r["boss_kills"] > 0 for r in runs) / len(runs),
+            "damage_mean": statistics.fmean(r["damage_taken"] for r in runs),
+        }
+    return summary
+
+
+def format_summary(summary):
+    lines = [f"{'policy':<10}{'games':>7}{'surv avg':>10}{'surv med':>10}{'died':>7}"
+             f"{'score':>9}{'max':>7}{'boss':>7}{'b.kill':>8}{'damage':>8}"]
+    for policy, s in sorted(summary.items()):
+        lines.append(
+            f"{policy:<10}{s['episodes']:>7}{s['survival_mean']:>10.1f}"
+            f"{s['survival_median']:>10.1f}{s['died']:>7.0%}{s['score_mean']:>9.1f}"
+            f"{s['score_max']:>7}{s['boss_reached']:>7.0%}{s['boss_killed']:>8.0%}"
+            f"{s['damage_mean']:>8.1f}")
+    return "\n".join(lines)
+
+
+def parse_override(text):
+    name, _, value = text.partition("=")
+    return name, json.loads(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run many headless bot games")
+    parser.add_argument("--policy", nargs="+", default=["aim"],
+                        help=f"bot policies: {', '.join(POLICIES)} or module:Class")
+    parser.add_argument("--episodes", type=int, default=256, help="games per policy")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for all games")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-seconds", type=float, default=EPISODE_SECONDS,
+                        help="cut games off after this much game time")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="games per task")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        type=parse_override, help="override a world.py constant")
+    parser.add_argument("--waves", metavar="PATH", help="play a JSON/TOML wave timeline")
+    parser.add_argument("--out", metavar="PATH", help="append every game to a JSONL file")
+    args = parser.parse_args()
+
+    for policy in args.policy:
+        load_policy(policy)
+    overrides = dict(args.set)
+    apply_overrides(overrides)
+
+    out = open(args.out, "a") if args.out else None
+    results = []
+    total = args.episodes * len(args.policy)
+    start = time.perf_counter()
+    try:
+        for chunk in run_batch(args.policy, args.episodes, args.seed, args.workers,
+                               args.max_seconds, overrides, args.chunk, args.waves):
+            results.extend(chunk)
+            if out:
+                for result in chunk:
+                    out.write(json.dumps(result) + "\n")
+                out.flush()
+            print(f"\r{len(results)}/{total} games", end="", file=sys.stderr, flush=True)
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"\r{total} games in {elapsed:.1f}s", file=sys.stderr)
+    print(format_summary(summarize(results)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from world import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, World, Inputs, Enemy, Boss, BULLET_RADIUS,
+    BULLET_SPEED, BOSS_SCORE,
+)
+from patterns import compile_phases
+from projectiles import OWNER_PLAYER, OWNER_BOSS
+from swarm import SwarmWorld
+
+# Stress benchmarks for World.step (and the batched renderer when a GL
+# context can be made). Each scenario builds a synthetic state with N
+# enemies and N player bullets, optionally with the boss on screen and
+# rapid fire held down, then times ticks. Between ticks, untimed, the
+# enemies, bullets and swarm rows that died or left are replaced, so every
+# tick works on the full N rather than on whatever survived the first few.
+#
+#   python bench.py                       run everything, print a table
+#   python bench.py --save base.json      ... and store the results
+#   python bench.py --compare base.json   fail if a scenario got slower
+#   python bench.py --swarm               tick cost versus swarm size instead
+#   python bench.py --boss-bullets        ... versus live boss bullets
+
+SIZES = [10, 100, 1000, 10000, 100000]
+SWARM_SIZES = [1000, 2000, 5000, 10000, 20000]
+BOSS_BULLET_SIZES = [1000, 5000, 10000, 20000]
+TICK_BUDGET = 200000    # entity-ticks per scenario, so big ones stay quick
+DEFAULT_THRESHOLD = 0.15
+DT = 1 / 60
+# a spiral volley every tick on top of the standing bullets
+BULLET_HELL = [{"patterns": [
+    {"kind": "ring", "count": 40, "every": DT, "spin": 3.75, "speed": 2.5},
+]}]
+
+
+def scatter(world, rng, count):
+    # count points over the screen, none within 150 px of the player
+    x = rng.uniform(0, SCREEN_WIDTH, count)
+    y = rng.uniform(0, SCREEN_HEIGHT, count)
+    near = np.hypot(x - world.player_x, y - world.player_y) < 150
+    x[near] = (x[near] + SCREEN_WIDTH / 2) % SCREEN_WIDTH
+    return x, y
+
+
+def add_enemies(world, rng, count):
+    x, y = scatter(world, rng, count)
+    for x, y in zip(x.tolist(), y.tolist()):
+        enemy = Enemy(world.rng)
+        enemy.x = enemy.prev_x = x
+        enemy.y = enemy.prev_y = y
+        world.add_enemy(enemy)
+
+
+def add_bullets(world, rng, count):
+    angle = rng.uniform(0, 2 * np.pi, count)
+    world.projectiles.spawn_many(
+        rng.uniform(0, SCREEN_WIDTH, count), rng.uniform(0, SCREEN_HEIGHT, count),
+        np.cos(angle) * BULLET_SPEED, np.sin(angle) * BULLET_SPEED,
+        BULLET_RADIUS, 1, OWNER_PLAYER)
+
+
+def build_world(size, boss, rapid_fire, seed=1234):
+    world = World(seed=seed)
+    rng = np.random.default_rng(seed)
+    add_enemies(world, rng, size)
+    add_bullets(world, rng, size)
+
+    def refill():
+        # rapid fire can take the player's own shots past size; those stay
+        add_enemies(world, rng, max(0, size - len(world.enemies)))
+        add_bullets(world, rng, max(0, size - len(world.projectiles.owned_by(OWNER_PLAYER))))
+    world.refill = refill
+
+    if boss:
+        world.set_boss(Boss(world.rng))
+        world.boss.y = world.boss.prev_y = SCREEN_HEIGHT - 100
+        world.score = BOSS_SCORE
+    if rapid_fire:
+        world.start_effect("rapid_fire", 1e9)
+    world.next_spawn_at = 1e9
+    return world
+
+
+def build_swarm(size, boss, rapid_fire, seed=1234):
+    # a full swarm scattered over the screen, clear of the player
+    world = SwarmWorld(seed=seed, size=size)
+    rng = np.random.default_rng(seed)
+
+    def refill(count=None):
+        count = max(0, size - world.swarm.count) if count is None else count
+        x, y = scatter(world, rng, count)
+        world.swarm.spawn_many(x, y, rng.integers(0, 2, count), 3)
+    refill(size)
+    world.refill = refill
+
+    if boss:
+        world.set_boss(Boss(world.rng))
+        world.boss.y = world.boss.prev_y = SCREEN_HEIGHT - 100
+        world.score = BOSS_SCORE
+    if rapid_fire:
+        world.start_effect("rapid_fire", 1e9)
+    return world
+
+
+def build_bullet_hell(size, boss, rapid_fire, seed=1234):
+    # `size` slow boss bullets scattered over the screen and a boss in the
+    # middle adding a 40-bullet spiral volley every tick
+    world = World(seed=seed)
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(0, 2 * np.pi, size)
+    world.projectiles.spawn_many(
+        rng.uniform(0, SCREEN_WIDTH, size), rng.uniform(0, SCREEN_HEIGHT, size),
+        np.cos(angle) * 0.5, np.sin(angle) * 0.5, 6, 30, OWNER_BOSS)
+
+    world.set_boss(Boss(world.rng, x=SCREEN_WIDTH / 2, phases=compile_phases(BULLET_HELL)))
+    world.boss.y = world.boss.prev_y = SCREEN_HEIGHT / 2
+    world.boss.speed = 0
+    world.score = BOSS_SCORE
+    if rapid_fire:
+        world.start_effect("rapid_fire", 1e9)
+    world.next_spawn_at = 1e9
+    # the volleys keep the bullet count climbing; nothing to top up
+    world.refill = None
+    return world
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+def time_ticks(world, ticks, rapid_fire):
+    inputs = Inputs(shoot=rapid_fire, angle=0)
+    samples = []
+    for i in range(ticks):
+        start = time.perf_counter_ns()
+        world.step(DT, inputs)
+        samples.append(time.perf_counter_ns() - start)
+        # keep the player alive and the population at size so every tick
+        # does the full amount of work
+        world.health = 100
+        world.game_over = False
+        if world.refill is not None:
+            world.refill()
+    return samples
+
+
+def peak_memory(build, size, boss, rapid_fire, ticks):
+    gc.collect()
+    tracemalloc.start()
+    world = build(size, boss, rapid_fire)
+    time_ticks(world, ticks, rapid_fire)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def make_renderer():
+    # a hidden window for draw timings; skipped when there's no GL
+    try:
+        import arcade
+        from renderer import BatchRenderer
+        window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, "bench", visible=False)
+        return window, BatchRenderer(window.ctx)
+    except Exception as e:
+        print(f"no GL context, skipping draw timings ({e})", file=sys.stderr)
+        return None, None
+
+
+def time_draws(window, renderer, world, frames):
+    samples = []
+    for i in range(frames):
+        start = time.perf_counter_ns()
+        window.clear()
+        renderer.draw(world)
+        window.ctx.finish()
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def summarize(samples):
+    total = sum(samples)
+    return {
+        "ticks_per_sec": len(samples) / (total / 1e9) if total else 0.0,
+        "p50_ms": percentile(samples, 0.50) / 1e6,
+        "p95_ms": percentile(samples, 0.95) / 1e6,
+        "p99_ms": percentile(samples, 0.99) / 1e6,
+    }
+
+
+def run(sizes, draw=False, memory=True, swarm=False, boss_bullets=False):
+    build = build_swarm if swarm else build_world
+    prefix = "swarm" if swarm else "n"
+    if boss_bullets:
+        build = build_bullet_hell
+        prefix = "bossbullets"
+    window = renderer = None
+    if draw:
+        window, renderer = make_renderer()
+
+    results = {}
+    for size in sizes:
+        ticks = max(3, min(200, TICK_BUDGET // size))
+        for boss in ((True,) if boss_bullets else (False, True)):
+            for rapid_fire in (False, True):
+                name = f"{prefix}{size}-boss{int(boss)}-rapid{int(rapid_fire)}"
+                world = build(size, boss, rapid_fire)
+                result = summarize(time_ticks(world, ticks, rapid_fire))
+                result["ticks"] = ticks
+                if memory:
+                    result["peak_mb"] = (peak_memory(build, size, boss, rapid_fire, ticks)
+                                         / 2 ** 20)
+                if renderer is not None:
+                    world = build(size, boss, rapid_fire)
+                    frames = max(3, min(60, ticks))
+                    draw_stats = summarize(time_draws(window, renderer, world, frames))
+                    result["draw_p50_ms"] = draw_stats["p50_ms"]
+                    result["draw_p95_ms"] = draw_stats["p95_ms"]
+                results[name] = result
+                print(format_row(name, result), flush=True)
+    return results
+
+
+def format_row(name, r):
+    row = (f"{name:<26}{r['ticks_per_sec']:>11.1f}{r['p50_ms']:>10.3f}"
+           f"{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+    if "peak_mb" in r:
+        row += f"{r['peak_mb']:>10.1f}"
+    if "draw_p50_ms" in r:
+        row += f"{r['draw_p50_ms']:>10.3f}"
+    return row
+
+
+def compare(results, baseline, threshold):
+    # a scenario regresses when its median tick got slower by more than
+    # threshold (as a fraction of the baseline)
+    failures = []
+    for name, base in baseline.items():
+        now = results.get(name)
+        if now is None:
+            continue
+        for key in ("p50_ms", "draw_p50_ms"):
+            if key in base and key in now and base[key] > 0:
+                change = now[key] / base[key] - 1
+                if change > threshold:
+                    failures.append(f"{name} {key}: {base[key]:.3f} -> {now[key]:.3f} "
+                                    f"(+{change:.0%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="space shooter stress benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+")
+    parser.add_argument("--swarm", action="store_true",
+                        help="benchmark swarm mode (default sizes %s)" % SWARM_SIZES)
+    parser.add_argument("--boss-bullets", action="store_true",
+                        help="benchmark boss bullet patterns (default sizes %s)"
+                             % BOSS_BULLET_SIZES)
+    parser.add_argument("--draw", action="store_true", help="also time the batched renderer")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before --compare fails (default %(default)s)")
+    args = parser.parse_args()
+
+    header = f"{'scenario':<26}{'ticks/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if not args.no_memory:
+        header += f"{'peak MB':>10}"
+    if args.draw:
+        header += f"{'draw p50':>10}"
+    print(header)
+    if args.sizes:
+        sizes = args.sizes
+    elif args.boss_bullets:
+        sizes = BOSS_BULLET_SIZES
+    else:
+        sizes = SWARM_SIZES if args.swarm else SIZES
+    results = run(sizes, draw=args.draw, memory=not args.no_memory, swarm=args.swarm,
+                  boss_bullets=args.boss_bullets)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.threshold)
+        for failure in failures:
+            print("REGRESSION", failure)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
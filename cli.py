@@ -0,0 +1,15 @@
+import argparse
+
+# Argument types shared by the command-line tools. Nothing but argparse is
+# imported here, so the game script can use them before numpy loads.
+
+
+def world_size(text):
+    # "2700x1800" -> (2700, 1800)
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"world size must be positive, got {text!r}")
+    return width, height
@@ -0,0 +1,101 @@
+from collections import deque
+
+# Adaptive frame budget. The window reports how long each frame's work took
+# (update plus draw); every EVAL_FRAMES frames the governor looks at the
+# slowest frames of the last WINDOW and moves between quality levels:
+#
+#   over budget                          -> one level down, at once
+#   under UP_HEADROOM of budget for UP_FRAMES -> one level up
+#
+# The gap between the two thresholds, the longer wait to come back up, and
+# the COOLDOWN after every change are the hysteresis: a frame time sitting
+# near the budget can't flip the level back and forth.
+#
+# Only cosmetic work is ever given up - health bars, particles, circle
+# detail, powerup glyphs. Nothing the simulation does depends on the level,
+# so replays and snapshots are unaffected by how fast the machine is.
+
+WINDOW = 30             # recent frames looked at
+PERCENTILE = 0.9        # of those, the one judged
+EVAL_FRAMES = 15
+UP_HEADROOM = 0.6
+UP_FRAMES = 120
+COOLDOWN = 30           # frames after a change before the next one
+LOG_SIZE = 100
+
+
+class Quality:
+    def __init__(self, name, bar_range, particle_stride, circle_segments, glyphs):
+        self.name = name
+        # health bars only on hurt enemies this close to the player (px);
+        # inf for all of them, 0 for none
+        self.bar_range = bar_range
+        self.particle_stride = particle_stride  # draw every nth particle; 0 for none
+        self.circle_segments = circle_segments
+        self.glyphs = glyphs                    # powerup icons over their circles
+
+
+QUALITY_LEVELS = [
+    Quality("full", float("inf"), 1, 16, True),
+    Quality("thin", 400, 2, 12, True),
+    Quality("simple", 0, 4, 8, True),
+    Quality("minimal", 0, 0, 6, False),
+]
+
+
+class FrameGovernor:
+    # fixed: a level index to stay at, or None to adapt
+    def __init__(self, budget=1 / 60, levels=QUALITY_LEVELS, fixed=None):
+        self.budget = budget
+        self.levels = levels
+        self.fixed = fixed
+        self.level = fixed or 0
+        self.samples = deque(maxlen=WINDOW)
+        self.frames = 0
+        self.last_change = -COOLDOWN
+        self.calm_frames = 0
+        # (frame, from level, to level, judged frame time in s)
+        self.log = deque(maxlen=LOG_SIZE)
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.frames += 1
+        if self.fixed is not None or self.frames % EVAL_FRAMES:
+            return
+        judged = sorted(self.samples)[int(PERCENTILE * (len(self.samples) - 1))]
+        if judged < self.budget * UP_HEADROOM:
+            self.calm_frames += EVAL_FRAMES
+        else:
+            self.calm_frames = 0
+        if self.frames - self.last_change < COOLDOWN:
+            return
+
+        if judged > self.budget and self.level < len(self.levels) - 1:
+            self.change(self.level + 1, judged)
+        elif self.calm_frames >= UP_FRAMES and self.level > 0:
+            self.change(self.level - 1, judged)
+
+    def change(self, level, judged):
+        self.log.append((self.frames, self.level, level, judged))
+        self.level = level
+        self.last_change = self.frames
+        self.calm_frames = 0
+        # judge the new level on its own frames
+        self.samples.clear()
+
+    def log_lines(self, count=None):
+        entries = list(self.log)[-count:] if count else self.log
+        lines = []
+        for frame, old, new, judged in entries:
+            lines.append(f"frame {frame}: {self.levels[old].name} -> {self.levels[new].name} "
+                         f"(p{int(PERCENTILE * 100)} {judged * 1000:.1f} ms, "
+                         f"budget {self.budget * 1000:.1f} ms)")
+        return lines
+
+    def overlay_lines(self):
+        mode = "fixed" if self.fixed is not None else "auto"
+        return [f"quality {self.quality.name} ({mode})"] + self.log_lines(3)
@@ -0,0 +1,94 @@
+import argparse
+import json
+from time import perf_counter, sleep
+
+import arcade
+
+from cli import world_size
+from swarm import GAME_MODES
+from window import GameWindow
+
+# Frame-time jitter with and without the sim thread. Each mode plays the same
+# seeded game in a window for a few seconds, holding fire, with the profiler
+# on. Frames are paced here at a steady display rate rather than by
+# arcade.run(), which doesn't pace a headless window at all. The table
+# compares how evenly ticks and frames arrive:
+#
+#   tick gap    time between the starts of two sim ticks (target 1/tick rate)
+#   frame gap   time between two on_draw calls (target the display's rate)
+#   draw        on_draw itself; pack is building a render frame on the sim thread
+#
+#   python jitter.py --seconds 10 --mode swarm
+#   ARCADE_HEADLESS=1 python jitter.py     (no display needed)
+
+RUN_SECONDS = 5.0
+DISPLAY_HZ = 60
+PHASES = ("tick gap", "frame gap", "draw", "pack")
+
+
+def play(window, seconds, display_hz):
+    frame = 1 / display_hz
+    start = last = next_frame = perf_counter()
+    while perf_counter() - start < seconds:
+        window.dispatch_events()
+        now = perf_counter()
+        window.on_update(now - last)
+        last = now
+        window.on_draw()
+        window.flip()
+        next_frame += frame
+        delay = next_frame - perf_counter()
+        if delay > 0:
+            sleep(delay)
+        else:
+            next_frame = perf_counter()
+    window.on_close()
+
+
+def measure(threaded, seconds, seed, mode, world_size, display_hz):
+    window = GameWindow(seed=seed, mode=mode, world_size=world_size, threaded=threaded)
+    window.keys_pressed.add(arcade.key.SPACE)
+    # the first frame builds shaders, glyphs and text; don't count it
+    window.on_draw()
+    window.profiler.reset()
+    window.profiler.enabled = True
+    play(window, seconds, display_hz)
+    report = window.profiler.report()
+    return {name: report[name] for name in PHASES if name in report}
+
+
+def format_table(results):
+    lines = [f"{'':<10}{'phase':<11}{'n':>6}{'mean':>8}{'stdev':>8}"
+             f"{'p50':>8}{'p99':>8}{'max':>8}"]
+    for label, report in results.items():
+        for name, s in report.items():
+            lines.append(f"{label:<10}{name:<11}{s['samples']:>6}{s['mean_ms']:8.2f}"
+                         f"{s['stdev_ms']:8.2f}{s['p50_ms']:8.2f}{s['p99_ms']:8.2f}"
+                         f"{s['max_ms']:8.2f}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare sim/render jitter with and "
+                                                 "without the sim thread")
+    parser.add_argument("--seconds", type=float, default=RUN_SECONDS, help="per mode")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mode", choices=list(GAME_MODES), default="classic")
+    parser.add_argument("--world", type=world_size, metavar="WIDTHxHEIGHT")
+    parser.add_argument("--display-hz", type=float, default=DISPLAY_HZ,
+                        help="frames per second to draw at (default %(default)s)")
+    parser.add_argument("--json", metavar="PATH", help="also write the numbers to PATH")
+    args = parser.parse_args()
+
+    results = {}
+    for label, threaded in (("single", False), ("threaded", True)):
+        results[label] = measure(threaded, args.seconds, args.seed, args.mode, args.world,
+                                 args.display_hz)
+    print("\n".join(format_table(results)))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import random
+import statistics
+
+from batch import RandomPolicy
+from replay import UP, DOWN, LEFT, RIGHT, SHOOT, RESTART
+from server import HELLO, INPUT, BYE, HISTORY, CLIENT_MESSAGE, PLAYER, GameServer, decode
+
+# Loopback harness for server.py: one server and N bot clients in one process,
+# talking real UDP over 127.0.0.1, with every datagram in both directions
+# pushed through a LossyLink that delays and drops it.
+#
+#   python loopback.py --clients 1 8 32 --latency 50 --jitter 10 --loss 0.05
+#
+# Reports what each client received per second, how often it needed a full
+# snapshot, and the server's tick cost (simulate + quantize + encode + send).
+# At the end every client's rebuilt state is checked against the server's
+# tables for the same tick, so a broken delta shows up as a mismatch.
+
+SECONDS = 10
+LATENCY_MS = 50
+JITTER_MS = 10
+LOSS = 0.05
+CLIENT_COUNTS = [1, 8, 32]
+
+
+class LossyLink:
+    # stands in for a transport: sendto() drops a datagram with probability
+    # `loss`, otherwise delivers it `latency` (+ up to `jitter`) seconds later
+    def __init__(self, transport, latency, jitter, loss, rng):
+        self.transport = transport
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = rng
+        self.loop = asyncio.get_running_loop()
+        self.sent = 0
+        self.dropped = 0
+
+    def sendto(self, data, address=None):
+        self.sent += 1
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        delay = self.latency + self.jitter * self.rng.random()
+        self.loop.call_later(delay, self.deliver, data, address)
+
+    def deliver(self, data, address):
+        if not self.transport.is_closing():
+            self.transport.sendto(data, address)
+
+
+class BotClient(asyncio.DatagramProtocol):
+    # rebuilds the server's tables from snapshots and answers each one with
+    # an ack and a RandomPolicy input (used if it is flying); it always asks
+    # for a restart, so a game over doesn't end the load
+    def __init__(self, link_args, rng):
+        self.link_args = link_args
+        self.rng = rng
+        self.policy = RandomPolicy(rng)
+        self.link = None
+        self.states = {}
+        self.tick = 0
+        self.bytes_received = 0
+        self.snapshots = 0
+        self.stale = 0
+
+    def connection_made(self, transport):
+        self.link = LossyLink(transport, *self.link_args, self.rng)
+        self.send(HELLO)
+
+    def send(self, kind):
+        inputs = self.policy.act(None)
+        flags = ((UP if inputs.up else 0) | (DOWN if inputs.down else 0) |
+                 (LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) |
+                 (SHOOT if inputs.shoot else 0) | RESTART)
+        self.link.sendto(CLIENT_MESSAGE.pack(kind, self.tick, flags, inputs.angle))
+
+    def datagram_received(self, data, address):
+        self.bytes_received += len(data)
+        decoded = decode(data, self.states)
+        if decoded is None:
+            self.stale += 1
+            return
+        tick, player, tables = decoded
+        if tick > self.tick:
+            self.snapshots += 1
+            self.states[tick] = (player, tables)
+            self.states.pop(tick - HISTORY, None)
+            self.tick = tick
+        self.send(INPUT)
+
+
+def same_tables(a, b):
+    return all((a[k][0] == b[k][0]).all() and (a[k][1] == b[k][1]).all() for k in a)
+
+
+async def session(clients, seconds, latency, jitter, loss, seed, waves_path=None):
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    link_args = (latency, jitter, loss)
+
+    def link(transport):
+        return LossyLink(transport, *link_args, random.Random(rng.random()))
+
+    server_transport, server = await loop.create_datagram_endpoint(
+        lambda: GameServer(seed, waves_path=waves_path, wrap=link), local_addr=("127.0.0.1", 0))
+    address = server_transport.get_extra_info("sockname")
+
+    bots = []
+    for i in range(clients):
+        transport, bot = await loop.create_datagram_endpoint(
+            lambda: BotClient(link_args, random.Random(rng.random())), remote_addr=address)
+        bots.append((transport, bot))
+
+    await server.run(ticks=int(seconds / server.dt))
+
+    # compare before anything else arrives
+    mismatches = 0
+    for transport, bot in bots:
+        if bot.tick in server.history and bot.tick in bot.states:
+            player, tables = bot.states[bot.tick]
+            ours, theirs = server.history[bot.tick]
+            if player != PLAYER.unpack(ours) or not same_tables(tables, theirs):
+                mismatches += 1
+    full = sum(client.full_snapshots for client in server.clients.values())
+    for transport, bot in bots:
+        bot.send(BYE)
+    await asyncio.sleep(latency + jitter + 0.05)
+    for transport, bot in bots:
+        transport.close()
+    server_transport.close()
+    return server, [bot for transport, bot in bots], full, mismatches
+
+
+def report(clients, seconds, server, bots, full, mismatches):
+    costs = sorted(server.tick_costs)
+    mean = statistics.fmean(costs) * 1e3
+    p95 = costs[int(len(costs) * 0.95)] * 1e3
+    peak = costs[-1] * 1e3
+    received = [bot.bytes_received / seconds / 1024 for bot in bots]
+    stale = sum(bot.stale for bot in bots)
+    world = server.world
+    return (f"{clients:>7} {statistics.fmean(received):>8.1f} {max(received):>8.1f} "
+            f"{mean:>7.2f} {p95:>7.2f} {peak:>7.2f} {full:>5} {stale:>5} "
+            f"{len(world.enemies) + world.projectiles.count:>8} {mismatches:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="server.py over a simulated network")
+    parser.add_argument("--clients", type=int, nargs="+", default=CLIENT_COUNTS)
+    parser.add_argument("--seconds", type=float, default=SECONDS)
+    parser.add_argument("--latency", type=float, default=LATENCY_MS, help="one-way ms")
+    parser.add_argument("--jitter", type=float, default=JITTER_MS, help="extra ms, uniform")
+    parser.add_argument("--loss", type=float, default=LOSS, help="drop probability per datagram")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--waves", metavar="PATH", help="JSON/TOML wave timeline for more load")
+    args = parser.parse_args()
+
+    print(f"{args.seconds:g} s, {args.latency:g}+{args.jitter:g} ms, {args.loss:.0%} loss")
+    print(f"{'clients':>7} {'KiB/s':>8} {'max':>8} {'tick ms':>7} {'p95':>7} {'max':>7} "
+          f"{'full':>5} {'stale':>5} {'entities':>8} {'mismatch':>8}")
+    failed = False
+    for clients in args.clients:
+        server, bots, full, mismatches = asyncio.run(session(
+            clients, args.seconds, args.latency / 1000, args.jitter / 1000, args.loss, args.seed,
+            args.waves))
+        print(report(clients, args.seconds, server, bots, full, mismatches))
+        failed = failed or mismatches > 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
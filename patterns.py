@@ -0,0 +1,141 @@
+import math
+from fractions import Fraction
+
+import numpy as np
+
+from projectiles import OWNER_BOSS
+
+# Boss bullet patterns. A pattern is a declarative dict:
+#
+#   {"kind": "fan", "count": 5, "spread": 40, "every": 1.5}
+#   {"kind": "ring", "count": 24, "every": 1.0, "spin": 7.5}
+#
+# A "fan" is `count` bullets spread evenly over `spread` degrees, centred on
+# the player ("aim", default on). A "ring" is `count` bullets evenly around
+# the full circle, starting at angle 0 (aim defaults to off). "spin" turns
+# each volley that many degrees further than the last, which makes a ring a
+# spiral. "every" is the cooldown in seconds, "delay" the wait before the
+# first volley of a phase; "speed" (px per base tick), "radius" and "damage"
+# are the bullets'. Damage is health taken from the player per hit; it
+# defaults to what an ordinary enemy bullet does.
+#
+# BOSS_PHASES picks the patterns by boss health: a phase is active once
+# Boss.health is at or below its "health" value, the lowest match winning.
+#
+# compile_phases() turns every pattern into a direction table once: unit
+# vectors for each volley of the spin cycle, so a volley is one row lookup
+# and, for aimed patterns, one rotation by the aim - no trig per bullet -
+# followed by a single ProjectileStore.spawn_many(). A spin that takes more
+# than MAX_CYCLE volleys to come back round (0.1 or 7.3 degrees, say) keeps
+# only the first volley's table, and each volley is rotated from it by
+# volley * spin instead.
+
+PATTERN_KEYS = {"kind", "count", "spread", "every", "delay", "spin", "aim", "speed",
+                "radius", "damage"}
+KINDS = ("fan", "ring")
+MAX_CYCLE = 360    # most volleys in a precompiled spin cycle
+
+BOSS_PHASES = [
+    {"health": 100, "patterns": [
+        # the original boss: a small aimed shot every 1.5 s, a big one every 8 s
+        {"kind": "fan", "count": 1, "every": 1.5},
+        {"kind": "fan", "count": 1, "every": 8.0, "radius": 12, "damage": 40},
+    ]},
+    {"health": 70, "patterns": [
+        {"kind": "fan", "count": 5, "spread": 40, "every": 1.5},
+        {"kind": "ring", "count": 32, "every": 1.0, "spin": 5.625, "speed": 4},
+        {"kind": "fan", "count": 1, "every": 8.0, "radius": 12, "damage": 40},
+    ]},
+    {"health": 40, "patterns": [
+        {"kind": "ring", "count": 12, "every": 0.1, "spin": 11.25, "speed": 5},
+        {"kind": "ring", "count": 64, "every": 1.5, "speed": 3},
+        {"kind": "fan", "count": 9, "spread": 80, "every": 1.0, "delay": 0.5},
+    ]},
+]
+
+
+class Pattern:
+    def __init__(self, directions, spin, aim, every, delay, speed, radius, damage):
+        self.directions = directions    # (cycle, count, 2) unit vectors
+        self.spin = spin                # degrees per volley not already in the table
+        self.aim = aim
+        self.every = every
+        self.delay = delay
+        self.speed = speed
+        self.radius = radius
+        self.damage = damage
+
+    def emit(self, store, x, y, reach, angle, volley):
+        # one volley from (x, y), `reach` out from the centre; `angle` is the
+        # aim in degrees and `volley` counts this pattern's earlier volleys
+        table = self.directions[volley % len(self.directions)]
+        ux = table[:, 0]
+        uy = table[:, 1]
+        if self.aim or self.spin:
+            turn = (angle if self.aim else 0.0) + volley * self.spin % 360
+            c = math.cos(math.radians(turn))
+            s = math.sin(math.radians(turn))
+            ux, uy = ux * c - uy * s, ux * s + uy * c
+        store.spawn_many(x + ux * reach, y + uy * reach, ux * self.speed, uy * self.speed,
+                         self.radius, self.damage, OWNER_BOSS)
+
+
+class Phase:
+    def __init__(self, health, patterns):
+        self.health = health
+        self.patterns = patterns
+
+
+def spin_cycle(spin):
+    # volleys until the spin comes back round to where it started, or None
+    # when that takes more than MAX_CYCLE
+    if spin == 0:
+        return 1
+    turn = (Fraction(spin) / 360).limit_denominator(MAX_CYCLE)
+    if abs(float(turn) * 360 - spin) > 1e-9:
+        return None
+    return turn.denominator
+
+
+def compile_pattern(spec, where):
+    unknown = set(spec) - PATTERN_KEYS
+    if unknown:
+        raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+    kind = spec.get("kind", "fan")
+    if kind not in KINDS:
+        raise ValueError(f"{where}: unknown kind {kind!r}; expected one of {KINDS}")
+    count = int(spec.get("count", 1))
+    every = float(spec.get("every", 1.0))
+    if count < 1 or every <= 0:
+        raise ValueError(f"{where}: count and every must be positive")
+
+    if kind == "ring":
+        offsets = np.arange(count) * (360 / count)
+    elif count == 1:
+        offsets = np.zeros(1)
+    else:
+        spread = float(spec.get("spread", 30))
+        offsets = np.linspace(-spread / 2, spread / 2, count)
+    spin = float(spec.get("spin", 0))
+    cycle = spin_cycle(spin)
+    turns = np.arange(cycle or 1) * spin
+    angles = np.radians(turns[:, None] + offsets[None, :])
+    directions = np.stack([np.cos(angles), np.sin(angles)], axis=2)
+
+    return Pattern(directions, 0.0 if cycle else spin, bool(spec.get("aim", kind == "fan")),
+                   every, float(spec.get("delay", 0)), float(spec.get("speed", 7)),
+                   float(spec.get("radius", 6)), int(spec.get("damage", 10)))
+
+
+def compile_phases(spec):
+    phases = []
+    for index, phase in enumerate(spec):
+        patterns = [compile_pattern(p, f"phase {index} pattern {i}")
+                    for i, p in enumerate(phase["patterns"])]
+        phases.append(Phase(phase.get("health", math.inf), patterns))
+    # highest threshold first, so the active phase is the last one matched
+    phases.sort(key=lambda phase: -phase.health)
+    return phases
+
+
+PHASES = compile_phases(BOSS_PHASES)
@@ -0,0 +1,147 @@
+import csv
+import json
+import math
+from array import array
+from time import perf_counter_ns
+
+# Per-phase frame timings. Each phase keeps its last PROFILE_WINDOW samples
+# (duration in ns and the entity count it worked on) in fixed ring buffers;
+# percentiles are only computed when someone asks for them. When disabled,
+# lap() is a single attribute check.
+#
+# interval() records the time between successive calls instead of a
+# duration, so its spread (stdev, p99 against p50) is the jitter of whatever
+# calls it: ticks of the sim, frames of the display.
+
+PROFILE_WINDOW = 600
+
+
+class PhaseStats:
+    def __init__(self, size):
+        self.size = size
+        self.durations = array("q", bytes(8 * size))
+        self.counts = array("q", bytes(8 * size))
+        self.filled = 0
+        self.next = 0
+
+    def add(self, duration, count):
+        i = self.next
+        self.durations[i] = duration
+        self.counts[i] = count
+        self.next = (i + 1) % self.size
+        if self.filled < self.size:
+            self.filled += 1
+
+    def summary(self):
+        if not self.filled:
+            return None
+        samples = sorted(self.durations[:self.filled])
+        last = self.filled - 1
+
+        def pct(p):
+            return samples[min(last, int(p * self.filled))] / 1e6
+
+        mean = sum(samples) / self.filled
+        stdev = math.sqrt(sum((s - mean) ** 2 for s in samples) / self.filled)
+        return {
+            "samples": self.filled,
+            "mean_ms": mean / 1e6,
+            "stdev_ms": stdev / 1e6,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": samples[last] / 1e6,
+            "entities": self.counts[(self.next - 1) % self.size],
+        }
+
+
+class FrameProfiler:
+    def __init__(self, enabled=False, size=PROFILE_WINDOW):
+        self.enabled = enabled
+        self.size = size
+        self.phases = {}
+        self.last_seen = {}
+
+    def mark(self):
+        return perf_counter_ns() if self.enabled else 0
+
+    def lap(self, name, start, count=0):
+        # record the time since start under name and return a new mark
+        if not self.enabled:
+            return 0
+        now = perf_counter_ns()
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats(self.size)
+        stats.add(now - start, count)
+        return now
+
+    def reset(self):
+        self.phases = {}
+        self.last_seen = {}
+
+    def interval(self, name):
+        # record the time since the last interval(name) call
+        if not self.enabled:
+            if self.last_seen:
+                # a gap spanning the time spent disabled would be meaningless
+                self.last_seen.clear()
+            return
+        now = perf_counter_ns()
+        last = self.last_seen.get(name)
+        self.last_seen[name] = now
+        if last is not None:
+            self.lap(name, last)
+
+    def report(self):
+        # phases can be added from another thread (see simthread.py), so
+        # iterate over a copy
+        report = {}
+        for name, stats in list(self.phases.items()):
+            summary = stats.summary()
+            if summary:
+                report[name] = summary
+        return report
+
+    def overlay_lines(self):
+        lines = ["phase          p50     p95     p99  stdev   n"]
+        for name, s in self.report().items():
+            lines.append(f"{name:<12}{s['p50_ms']:7.2f} {s['p95_ms']:7.2f} "
+                         f"{s['p99_ms']:7.2f} {s['stdev_ms']:6.2f}  {s['entities']}")
+        return lines
+
+    def dump(self, path):
+        report = self.report()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["phase", "samples", "mean_ms", "stdev_ms", "p50_ms",
+                                 "p95_ms", "p99_ms", "max_ms", "entities"])
+                for name, s in report.items():
+                    writer.writerow([name, s["samples"], s["mean_ms"], s["stdev_ms"],
+                                     s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"],
+                                     s["entities"]])
+        else:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+
+class StartupTimer:
+    # wall time for each stage of getting the game going, from a start mark
+    # taken as early as possible in the entry script
+    def __init__(self, started):
+        self.last = started
+        self.stages = []
+
+    def mark(self, name):
+        now = perf_counter_ns()
+        self.stages.append((name, now - self.last))
+        self.last = now
+
+    def lines(self):
+        lines = [f"{'startup stage':<30}{'ms':>8}{'total':>9}"]
+        total = 0
+        for name, duration in self.stages:
+            total += duration
+            lines.append(f"{name:<30}{duration / 1e6:8.1f}{total / 1e6:9.1f}")
+        return lines
@@ -0,0 +1,188 @@
+import numpy as np
+
+from sweep import contact_times
+
+# Struct-of-arrays storage for every bullet in flight. One advance() call
+# moves all of them and keep() compacts the arrays in place (stable, so the
+# order projectiles were fired in is preserved). Every projectile gets a
+# serial id when it is spawned, so something outside the store (the network
+# server) can tell the same bullet apart from tick to tick.
+
+OWNER_PLAYER = 0
+OWNER_ENEMY = 1
+OWNER_BOSS = 2
+
+
+class ProjectileStore:
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.capacity = 0
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.prev_x = np.empty(0)
+        self.prev_y = np.empty(0)
+        self.vx = np.empty(0)
+        self.vy = np.empty(0)
+        self.radius = np.empty(0, dtype=np.float32)
+        self.damage = np.empty(0, dtype=np.float32)
+        self.owner = np.empty(0, dtype=np.int8)
+        self.id = np.empty(0, dtype=np.int64)
+        self.next_id = 0
+        self.reserve(capacity)
+
+    def columns(self):
+        return (self.x, self.y, self.prev_x, self.prev_y, self.vx, self.vy,
+                self.radius, self.damage, self.owner, self.id)
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, self.capacity * 2)
+        n = self.count
+        for name in ("x", "y", "prev_x", "prev_y", "vx", "vy", "radius", "damage", "owner",
+                     "id"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def spawn(self, x, y, vx, vy, radius, damage, owner):
+        if self.count == self.capacity:
+            self.reserve(self.count + 1)
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.prev_x[i] = x
+        self.prev_y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.radius[i] = radius
+        self.damage[i] = damage
+        self.owner[i] = owner
+        self.id[i] = self.next_id
+        self.next_id += 1
+        self.count = i + 1
+        return i
+
+    def spawn_many(self, x, y, vx, vy, radius, damage, owner):
+        # bulk append; scalars are broadcast across the batch
+        k = len(x)
+        if k == 0:
+            return
+        start = self.count
+        self.reserve(start + k)
+        end = start + k
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.prev_x[start:end] = x
+        self.prev_y[start:end] = y
+        self.vx[start:end] = vx
+        self.vy[start:end] = vy
+        self.radius[start:end] = radius
+        self.damage[start:end] = damage
+        self.owner[start:end] = owner
+        self.id[start:end] = np.arange(self.next_id, self.next_id + k)
+        self.next_id += k
+        self.count = end
+
+    def advance(self, scale=1.0):
+        # velocities are per base tick; scale stretches them to this step
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        if scale == 1.0:
+            self.x[:n] += self.vx[:n]
+            self.y[:n] += self.vy[:n]
+        else:
+            self.x[:n] += self.vx[:n] * scale
+            self.y[:n] += self.vy[:n] * scale
+
+    def keep(self, mask):
+        n = self.count
+        k = int(np.count_nonzero(mask))
+        if k == n:
+            return
+        kept = np.flatnonzero(mask)
+        for column in self.columns():
+            column[:k] = column[kept]
+        self.count = k
+
+    def remove(self, indices):
+        if len(indices) == 0:
+            return
+        mask = np.ones(self.count, dtype=bool)
+        mask[indices] = False
+        self.keep(mask)
+
+    def clear(self):
+        self.count = 0
+
+    def sweep(self, x0, y0, x1, y1, radius, mask=None):
+        # (indices, contact times) of the projectiles whose path this step
+        # touched a circle of `radius` that moved from (x0, y0) to (x1, y1);
+        # a cheap box test over both paths first, then the exact swept test
+        n = self.count
+        reach = radius + self.radius[:n] + 1
+        px = self.prev_x[:n]
+        py = self.prev_y[:n]
+        xs = self.x[:n]
+        ys = self.y[:n]
+        box = np.minimum(px, xs) < max(x0, x1) + reach
+        box &= np.maximum(px, xs) > min(x0, x1) - reach
+        box &= np.minimum(py, ys) < max(y0, y1) + reach
+        box &= np.maximum(py, ys) > min(y0, y1) - reach
+        if mask is not None:
+            box &= mask
+        candidates = np.flatnonzero(box)
+        if len(candidates) == 0:
+            return candidates, np.empty(0)
+        t = contact_times(px[candidates] - x0, py[candidates] - y0,
+                          xs[candidates] - x1, ys[candidates] - y1,
+                          radius + self.radius[candidates])
+        hit = t <= 1
+        return candidates[hit], t[hit]
+
+    def owned_by(self, owner):
+        return np.flatnonzero(self.owner[:self.count] == owner)
+
+    def hostile(self):
+        return np.flatnonzero(self.owner[:self.count] != OWNER_PLAYER)
+
+    def views(self, indices):
+        return [ProjectileView(self, int(i)) for i in indices]
+
+
+class ProjectileView:
+    # read-only window onto one row of the store, valid until the next
+    # keep()/remove() compacts the arrays
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.store.x[self.index])
+
+    @property
+    def y(self):
+        return float(self.store.y[self.index])
+
+    @property
+    def radius(self):
+        return float(self.store.radius[self.index])
+
+    @property
+    def damage(self):
+        return float(self.store.damage[self.index])
+
+    @property
+    def owner(self):
+        return int(self.store.owner[self.index])
+
+    @property
+    def angle(self):
+        return float(np.degrees(np.arctan2(self.store.vy[self.index],
+                                           self.store.vx[self.index])))
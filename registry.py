@@ -0,0 +1,101 @@
+# Dense entity storage with generational handles.
+#
+# Entities sit in a packed list so iteration never copies. destroy() only
+# marks an entity and queues it; flush() (once per tick) swap-removes the
+# queued ones in O(1) each. A handle packs a slot number and the slot's
+# generation, so a handle to a destroyed entity never resolves to whatever
+# reuses its slot later.
+
+SLOT_BITS = 24
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+class Registry:
+    def __init__(self):
+        self.items = []         # dense: the live entities
+        self.dying = []         # dense: queued for destroy this tick
+        self.slots = []         # dense -> slot
+        self.dense_index = []   # slot -> dense index, -1 when free
+        self.generations = []   # slot -> current generation
+        self.free_slots = []
+        self.pending = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def add(self, item):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = len(self.generations)
+            self.generations.append(0)
+            self.dense_index.append(-1)
+        self.dense_index[slot] = len(self.items)
+        self.items.append(item)
+        self.dying.append(False)
+        self.slots.append(slot)
+        handle = (self.generations[slot] << SLOT_BITS) | slot
+        item.handle = handle
+        return handle
+
+    def index_of(self, handle):
+        slot = handle & SLOT_MASK
+        if slot >= len(self.generations) or self.generations[slot] != handle >> SLOT_BITS:
+            return -1
+        return self.dense_index[slot]
+
+    def get(self, handle):
+        index = self.index_of(handle)
+        if index < 0:
+            return None
+        return self.items[index]
+
+    def is_alive(self, handle):
+        index = self.index_of(handle)
+        return index >= 0 and not self.dying[index]
+
+    def destroy(self, handle):
+        index = self.index_of(handle)
+        if index < 0 or self.dying[index]:
+            return
+        self.dying[index] = True
+        self.pending.append(handle)
+
+    def flush(self):
+        items = self.items
+        dying = self.dying
+        slots = self.slots
+        dense_index = self.dense_index
+        for handle in self.pending:
+            slot = handle & SLOT_MASK
+            index = dense_index[slot]
+            last = len(items) - 1
+            if index != last:
+                items[index] = items[last]
+                dying[index] = dying[last]
+                moved = slots[last]
+                slots[index] = moved
+                dense_index[moved] = index
+            items.pop()
+            dying.pop()
+            slots.pop()
+            dense_index[slot] = -1
+            self.generations[slot] += 1
+            self.free_slots.append(slot)
+        self.pending.clear()
+
+    def clear(self):
+        for slot in self.slots:
+            self.dense_index[slot] = -1
+            self.generations[slot] += 1
+            self.free_slots.append(slot)
+        self.items.clear()
+        self.dying.clear()
+        self.slots.clear()
+        self.pending.clear()
@@ -0,0 +1,355 @@
+import arcade
+import numpy as np
+from arcade.gl import BufferDescription
+
+from governor import QUALITY_LEVELS
+from renderframe import TYPE_COLORS, pack_frame
+from textcache import TextCache, GlyphSprites
+from world import SCREEN_WIDTH, SCREEN_HEIGHT
+
+# Batched drawing: every shape in a frame is turned into triangles with numpy,
+# written into one reusable vertex buffer and drawn with a single call. The
+# immediate-mode draw_* functions in window.py stay around for comparison
+# (GameWindow(render_mode="immediate")).
+#
+# Circles (bullets, powerups, particles) are the bulk of it - a boss volley
+# alone can leave 10k bullets on screen - so they are drawn instanced
+# instead: one unit-circle mesh, and per circle only x, y, radius and colour
+# go into the instance buffer. Building 48 vertices per bullet in numpy cost
+# more than a whole frame at that count.
+#
+# What gets drawn is a renderframe.RenderFrame, never the world itself;
+# draw(world) packs one on the spot (culled to the view), a simulation
+# thread hands over the one it packed after its last tick.
+#
+# How much cosmetic detail goes in is a governor.Quality level, picked by the
+# window's FrameGovernor from recent frame times.
+
+CIRCLE_SEGMENTS = 16
+PARTICLE_SEGMENTS = 6
+
+BOUNDS_COLOR = (90, 90, 90, 255)
+SHIELD_COLOR = (80, 160, 255, 80)
+SHIELD_SCALE = 1.8
+
+# vertex layout: x, y, r, g, b, a (colour in 0-255, as arcade's shader expects)
+VERTEX_FLOATS = 6
+
+_rings = {}
+
+
+def unit_ring(segments):
+    ring = _rings.get(segments)
+    if ring is None:
+        angles = np.linspace(0, 2 * np.pi, segments + 1)
+        ring = _rings[segments] = (np.cos(angles), np.sin(angles))
+    return ring
+
+
+def triangles(ax, ay, bx, by, cx, cy, colors):
+    n = len(ax)
+    out = np.empty((n, 3, VERTEX_FLOATS), dtype=np.float32)
+    out[:, 0, 0] = ax
+    out[:, 0, 1] = ay
+    out[:, 1, 0] = bx
+    out[:, 1, 1] = by
+    out[:, 2, 0] = cx
+    out[:, 2, 1] = cy
+    out[..., 2:] = np.broadcast_to(colors, (n, 4))[:, None, :]
+    return out.reshape(-1, VERTEX_FLOATS)
+
+
+def rects(cx, cy, width, height, colors):
+    # centred rectangles as two triangles each
+    n = len(cx)
+    half_w = np.broadcast_to(width, (n,)) / 2
+    half_h = np.broadcast_to(height, (n,)) / 2
+    left = cx - half_w
+    right = cx + half_w
+    bottom = cy - half_h
+    top = cy + half_h
+    return np.concatenate([
+        triangles(left, bottom, right, bottom, right, top, colors),
+        triangles(left, bottom, right, top, left, top, colors),
+    ])
+
+
+def rect_outlines(cx, cy, width, height, border, colors):
+    half_w = width / 2
+    half_h = height / 2
+    return np.concatenate([
+        rects(cx, cy + half_h, width + border, border, colors),
+        rects(cx, cy - half_h, width + border, border, colors),
+        rects(cx - half_w, cy, border, height + border, colors),
+        rects(cx + half_w, cy, border, height + border, colors),
+    ])
+
+
+def health_bars(cx, cy, fraction, width, height, fill_colors, border):
+    fill_width = fraction * width
+    return np.concatenate([
+        rects(cx, cy, width, height, arcade.color.RED),
+        rects(cx - (width - fill_width) / 2, cy, fill_width, height, fill_colors),
+        rect_outlines(cx, cy, width, height, border, arcade.color.WHITE),
+    ])
+
+
+def lerp(prev, current, alpha):
+    return prev + (current - prev) * alpha
+
+
+def pointed_triangles(x, y, angle, radius, nose, spread, colors):
+    # the ship/enemy shape: a nose at `angle`, two rear corners at +-spread
+    a = np.radians(angle)
+    b = np.radians(angle + spread)
+    c = np.radians(angle - spread)
+    return triangles(
+        x + np.cos(a) * radius * nose, y + np.sin(a) * radius * nose,
+        x + np.cos(b) * radius, y + np.sin(b) * radius,
+        x + np.cos(c) * radius, y + np.sin(c) * radius,
+        colors,
+    )
+
+
+CIRCLE_VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_vert;
+in vec3 in_circle;
+in vec4 in_color;
+out vec4 v_color;
+
+void main() {
+    vec2 position = in_circle.xy + in_vert * in_circle.z;
+    gl_Position = window.projection * window.view * vec4(position, 0.0, 1.0);
+    v_color = in_color / 255.0;
+}
+"""
+
+CIRCLE_FRAGMENT_SHADER = """
+#version 330
+
+in vec4 v_color;
+out vec4 f_color;
+
+void main() {
+    f_color = v_color;
+}
+"""
+
+# instance layout: x, y, radius, r, g, b, a
+INSTANCE_FLOATS = 7
+
+
+def unit_circle_mesh(segments):
+    # (segments * 3, 2) triangles around the origin
+    ring_cos, ring_sin = unit_ring(segments)
+    mesh = np.zeros((segments, 3, 2), dtype=np.float32)
+    mesh[:, 1, 0] = ring_cos[:-1]
+    mesh[:, 1, 1] = ring_sin[:-1]
+    mesh[:, 2, 0] = ring_cos[1:]
+    mesh[:, 2, 1] = ring_sin[1:]
+    return mesh.reshape(-1, 2)
+
+
+def circle_instances(x, y, radius, colors):
+    n = len(x)
+    out = np.empty((n, INSTANCE_FLOATS), dtype=np.float32)
+    out[:, 0] = x
+    out[:, 1] = y
+    out[:, 2] = radius
+    out[:, 3:] = colors
+    return out
+
+
+class CircleBatch:
+    _programs = {}
+
+    def __init__(self, ctx, segments=CIRCLE_SEGMENTS, capacity=4096):
+        self.ctx = ctx
+        program = CircleBatch._programs.get(ctx)
+        if program is None:
+            program = CircleBatch._programs[ctx] = ctx.program(
+                vertex_shader=CIRCLE_VERTEX_SHADER, fragment_shader=CIRCLE_FRAGMENT_SHADER)
+        self.program = program
+        self.capacity = capacity
+        mesh = unit_circle_mesh(segments)
+        self.vertices = len(mesh)
+        self.buffer = ctx.buffer(reserve=capacity * INSTANCE_FLOATS * 4, usage="stream")
+        self.geometry = ctx.geometry(
+            [BufferDescription(ctx.buffer(data=mesh.tobytes()), "2f", ("in_vert",)),
+             BufferDescription(self.buffer, "3f 4f", ("in_circle", "in_color"),
+                               instanced=True)],
+            mode=ctx.TRIANGLES,
+        )
+        self.chunks = []
+
+    def add(self, x, y, radius, colors):
+        if len(x):
+            self.chunks.append(circle_instances(x, y, radius, colors))
+
+    def draw(self):
+        if not self.chunks:
+            return
+        data = np.concatenate(self.chunks) if len(self.chunks) > 1 else self.chunks[0]
+        self.chunks = []
+        count = len(data)
+        if count > self.capacity:
+            while self.capacity < count:
+                self.capacity *= 2
+            self.buffer.orphan(size=self.capacity * INSTANCE_FLOATS * 4)
+        self.buffer.write(data)
+        with self.ctx.enabled(self.ctx.BLEND):
+            self.geometry.render(self.program, vertices=self.vertices, instances=count)
+
+
+class TriangleBatch:
+    def __init__(self, ctx, capacity=4096):
+        self.ctx = ctx
+        self.program = ctx.line_generic_with_colors_program
+        self.capacity = capacity
+        self.buffer = ctx.buffer(reserve=capacity * VERTEX_FLOATS * 4, usage="stream")
+        self.geometry = ctx.geometry(
+            [BufferDescription(self.buffer, "2f 4f", ("in_vert", "in_color"))],
+            mode=ctx.TRIANGLES,
+        )
+        self.chunks = []
+
+    def add(self, vertices):
+        if len(vertices):
+            self.chunks.append(vertices)
+
+    def draw(self):
+        if not self.chunks:
+            return
+        data = np.concatenate(self.chunks)
+        self.chunks = []
+        count = len(data)
+        if count > self.capacity:
+            while self.capacity < count:
+                self.capacity *= 2
+            self.buffer.orphan(size=self.capacity * VERTEX_FLOATS * 4)
+        self.buffer.write(data)
+        with self.ctx.enabled(self.ctx.BLEND):
+            self.geometry.render(self.program, vertices=count)
+
+
+POWERUP_GLYPHS = {
+    "rapid_fire": "⚡",
+    "shield": "❤️",
+    "health": "💛",
+}
+
+
+class BatchRenderer:
+    def __init__(self, ctx, text_cache=None):
+        self.ctx = ctx
+        self.batch = TriangleBatch(ctx)
+        # one instanced batch per circle detail a quality level asks for
+        self.circle_batches = {CIRCLE_SEGMENTS: CircleBatch(ctx)}
+        self.particles = CircleBatch(ctx, PARTICLE_SEGMENTS)
+        self.text_cache = text_cache if text_cache is not None else TextCache()
+        self.glyphs = GlyphSprites(POWERUP_GLYPHS)
+
+    def circles(self, segments):
+        batch = self.circle_batches.get(segments)
+        if batch is None:
+            batch = self.circle_batches[segments] = CircleBatch(self.ctx, segments)
+        return batch
+
+    def add_enemies(self, ex, ey, angle, radius, colors, fraction, bar_range=np.inf,
+                    player=(0, 0)):
+        # health bars only on hurt enemies within bar_range of player
+        batch = self.batch
+        batch.add(pointed_triangles(ex, ey, angle, radius, 2, 140, colors))
+        if bar_range <= 0:
+            return
+        hurt = fraction < 1
+        if bar_range < np.inf:
+            hurt &= (ex - player[0]) ** 2 + (ey - player[1]) ** 2 < bar_range ** 2
+        if hurt.any():
+            batch.add(health_bars(ex[hurt], ey[hurt] + radius[hurt] + 30, fraction[hurt],
+                                  40, 5, arcade.color.GREEN, 1))
+
+    def draw(self, world, alpha=1.0, view=None, quality=QUALITY_LEVELS[0]):
+        # view is the (left, bottom, right, top) world rectangle on screen;
+        # None draws everything
+        self.draw_frame(pack_frame(world, view), alpha, quality)
+
+    def draw_frame(self, frame, alpha=1.0, quality=QUALITY_LEVELS[0]):
+        # alpha blends each body between its previous and current step, so
+        # motion stays smooth when the sim runs slower than the display
+        batch = self.batch
+        circles = self.circles(quality.circle_segments)
+        player_x = np.array([lerp(frame.prev_player_x, frame.player_x, alpha)])
+        player_y = np.array([lerp(frame.prev_player_y, frame.player_y, alpha)])
+        if frame.width > SCREEN_WIDTH or frame.height > SCREEN_HEIGHT:
+            batch.add(rect_outlines(np.array([frame.width / 2]), np.array([frame.height / 2]),
+                                    frame.width, frame.height, 4, BOUNDS_COLOR))
+
+        boss = frame.boss
+        if boss:
+            prev_x, prev_y, x, y, angle, radius, health, max_health, color = boss
+            boss_x = lerp(prev_x, x, alpha)
+            boss_y = lerp(prev_y, y, alpha)
+            a = np.radians(angle + np.array([0, 90, 180, 270]))
+            reach = radius * np.array([1.5, 1, 1.5, 1])
+            px = boss_x + np.cos(a) * reach
+            py = boss_y + np.sin(a) * reach
+            batch.add(triangles(px[[0]], py[[0]], px[[1]], py[[1]], px[[2]], py[[2]], color))
+            batch.add(triangles(px[[0]], py[[0]], px[[2]], py[[2]], px[[3]], py[[3]], color))
+
+            fraction = health / max_health
+            if fraction > 0.7:
+                fill = arcade.color.GREEN
+            elif fraction > 0.4:
+                fill = arcade.color.YELLOW
+            else:
+                fill = arcade.color.RED
+            batch.add(health_bars(np.array([boss_x]), np.array([boss_y + radius + 40]),
+                                  np.array([fraction]), 200, 15, fill, 2))
+
+        enemies = frame.enemies
+        if len(enemies):
+            self.add_enemies(lerp(enemies[:, 0], enemies[:, 2], alpha),
+                             lerp(enemies[:, 1], enemies[:, 3], alpha),
+                             enemies[:, 4], enemies[:, 5],
+                             TYPE_COLORS[enemies[:, 7].astype(np.intp)], enemies[:, 6],
+                             quality.bar_range, (player_x[0], player_y[0]))
+
+        batch.add(pointed_triangles(player_x, player_y, np.array([frame.player_angle]),
+                                    frame.player_radius, 1.5, 150, arcade.color.WHITE))
+        if frame.shielded:
+            circles.add(player_x, player_y, frame.player_radius * SHIELD_SCALE, SHIELD_COLOR)
+
+        rows = frame.circles
+        if len(rows):
+            circles.add(lerp(rows[:, 0], rows[:, 2], alpha), lerp(rows[:, 1], rows[:, 3], alpha),
+                        rows[:, 4], rows[:, 5:])
+
+        particles = frame.particles
+        if quality.particle_stride > 1:
+            particles = particles[::quality.particle_stride]
+        if len(particles) and quality.particle_stride:
+            self.particles.add(particles[:, 0], particles[:, 1], particles[:, 2],
+                               particles[:, 3:])
+
+        # circles go over everything else, as they always have
+        batch.draw()
+        circles.draw()
+        self.particles.draw()
+
+        # text is not part of the triangle batch
+        if boss:
+            self.text_cache.draw(f"BOSS HP: {health}/{max_health}",
+                                 boss_x - 80, boss_y + radius + 65, arcade.color.WHITE, 12)
+        if quality.glyphs:
+            self.glyphs.draw([
+                (kind if kind in POWERUP_GLYPHS else "health", x, lerp(prev_y, y, alpha))
+                for kind, x, prev_y, y in frame.glyphs
+            ])
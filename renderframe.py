@@ -0,0 +1,186 @@
+from time import perf_counter
+
+import numpy as np
+
+from projectiles import OWNER_PLAYER, OWNER_ENEMY
+from swarm import ENEMY_HEALTH
+from world import (ENEMY_TYPES, ENEMY_RADIUS, SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, RED, BLUE,
+                   YELLOW, ORANGE_RED)
+
+# Render frames: what one tick of the world looks like, packed into a few
+# small read-only tables. BatchRenderer only ever draws a frame, so a frame
+# can be built on the thread that steps the world and drawn on the one that
+# owns the GL context (see simthread.py) without either touching the
+# other's objects. Nothing in a frame refers back to the world: colours are
+# resolved to RGBA here, health is a fraction, and every body keeps its
+# previous and current position so the drawing side can still interpolate.
+#
+# The scalar fields use the World's names (player_x, score, game_over, ...),
+# so the window reads HUD and camera state the same way from either.
+#
+# In a world bigger than the screen only what is inside the camera's view
+# (plus VIEW_MARGIN, enough for an enemy's nose and health bar, and for the
+# camera to move a step between packing and drawing) is packed. Classic
+# enemies come from the world's view_index; the numpy-backed kinds (swarm
+# rows, projectiles, particles) are culled with one mask each, which is
+# cheaper than keeping an index over rows that move and get compacted every
+# tick.
+
+VIEW_MARGIN = 80
+
+# enemies: prev x, prev y, x, y, angle, radius, health fraction, ENEMY_TYPES index
+ENEMY_COLUMNS = 8
+# circles: prev x, prev y, x, y, radius, r, g, b, a
+CIRCLE_COLUMNS = 9
+# particles: x, y, size, r, g, b, a
+PARTICLE_COLUMNS = 7
+
+ENEMY_COLORS = {
+    "shooter": RED,
+    "normal": BLUE,
+}
+
+# enemy type index -> colour, in ENEMY_TYPES order
+TYPE_COLORS = np.array([ENEMY_COLORS[t] for t in ENEMY_TYPES], dtype=np.float32)
+
+
+def frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+def camera_view(width, height, x, y):
+    # the world rectangle a screen-sized camera centred on (x, y) shows,
+    # stopping at the world's edges, as (left, bottom, right, top)
+    half_w = SCREEN_WIDTH / 2
+    half_h = SCREEN_HEIGHT / 2
+    x = min(max(x, half_w), width - half_w) if width > SCREEN_WIDTH else width / 2
+    y = min(max(y, half_h), height - half_h) if height > SCREEN_HEIGHT else height / 2
+    return x - half_w, y - half_h, x + half_w, y + half_h
+
+
+def in_view(x, y, view):
+    left, bottom, right, top = view
+    return (x >= left) & (x <= right) & (y >= bottom) & (y <= top)
+
+
+class RenderFrame:
+    def __init__(self, world, tick, boss, enemies, circles, glyphs, particles):
+        self.tick = tick
+        self.time = perf_counter()      # when it was packed, for interpolation
+        self.width = world.width
+        self.height = world.height
+        self.score = world.score
+        self.health = world.health
+        self.game_over = world.game_over
+        self.prev_player_x = world.prev_player_x
+        self.prev_player_y = world.prev_player_y
+        self.player_x = world.player_x
+        self.player_y = world.player_y
+        self.player_angle = world.player_angle
+        self.player_radius = world.player_radius
+        self.shielded = "shield" in world.effects
+        # (prev x, prev y, x, y, angle, radius, health, max health, rgba) or None
+        self.boss = boss
+        self.enemies = frozen(enemies)
+        self.circles = frozen(circles)
+        self.glyphs = glyphs            # ((powerup type, x, prev y, y), ...)
+        self.particles = frozen(particles)
+
+    def __len__(self):
+        return len(self.enemies) + len(self.circles) + len(self.particles)
+
+
+def pack_enemies(world, view):
+    enemies = world.enemies
+    if view is not None and enemies:
+        enemies = world.visible_enemies(*view)
+    count = len(enemies)
+    out = np.empty((count, ENEMY_COLUMNS), dtype=np.float32)
+    if count:
+        types = ENEMY_TYPES.index
+        out[:] = [(e.prev_x, e.prev_y, e.x, e.y, e.angle, e.radius,
+                   e.health / e.max_health, types(e.enemy_type)) for e in enemies]
+
+    swarm = world.swarm
+    if swarm is None or not swarm.count:
+        return out
+    n = swarm.count
+    rows = slice(0, n)
+    if view is not None:
+        rows = np.flatnonzero(in_view(swarm.x[:n], swarm.y[:n], view))
+        n = len(rows)
+    packed = np.empty((n, ENEMY_COLUMNS), dtype=np.float32)
+    packed[:, 0] = swarm.prev_x[rows]
+    packed[:, 1] = swarm.prev_y[rows]
+    packed[:, 2] = swarm.x[rows]
+    packed[:, 3] = swarm.y[rows]
+    packed[:, 4] = swarm.angle[rows]
+    packed[:, 5] = ENEMY_RADIUS
+    packed[:, 6] = swarm.health[rows] / ENEMY_HEALTH
+    packed[:, 7] = swarm.type[rows]
+    return np.concatenate([out, packed]) if count else packed
+
+
+def pack_circles(world, view):
+    # projectiles, then powerups; powerups only fall, so their x doesn't move
+    store = world.projectiles
+    n = store.count
+    rows = slice(0, n)
+    if view is not None and n:
+        rows = np.flatnonzero(in_view(store.x[:n], store.y[:n], view))
+        n = len(rows)
+
+    powerups = world.powerups
+    if view is not None:
+        left, bottom, right, top = view
+        powerups = [p for p in powerups if left <= p.x <= right and bottom <= p.y <= top]
+
+    out = np.empty((n + len(powerups), CIRCLE_COLUMNS), dtype=np.float32)
+    if n:
+        out[:n, 0] = store.prev_x[rows]
+        out[:n, 1] = store.prev_y[rows]
+        out[:n, 2] = store.x[rows]
+        out[:n, 3] = store.y[rows]
+        out[:n, 4] = store.radius[rows]
+        owner = store.owner[rows]
+        colors = out[:n, 5:]
+        colors[:] = YELLOW
+        boss_small = (owner != OWNER_PLAYER) & (owner != OWNER_ENEMY) & (out[:n, 4] <= 6)
+        colors[boss_small] = ORANGE_RED
+    if powerups:
+        out[n:] = [(p.x, p.prev_y, p.x, p.y, p.radius) + tuple(p.color) for p in powerups]
+    glyphs = tuple((p.type, p.x, p.prev_y, p.y) for p in powerups)
+    return out, glyphs
+
+
+def pack_particles(world, view):
+    pool = world.particles
+    live = pool.alive()
+    if view is not None and len(live):
+        live = live[in_view(pool.x[live], pool.y[live], view)]
+    out = np.empty((len(live), PARTICLE_COLUMNS), dtype=np.float32)
+    out[:, 0] = pool.x[live]
+    out[:, 1] = pool.y[live]
+    out[:, 2] = pool.size[live]
+    out[:, 3:6] = pool.color[live]
+    out[:, 6] = pool.alpha[live]
+    return out
+
+
+def pack_frame(world, view=None, tick=0):
+    # view is the (left, bottom, right, top) world rectangle on screen; None
+    # packs everything
+    if view is not None:
+        left, bottom, right, top = view
+        view = (left - VIEW_MARGIN, bottom - VIEW_MARGIN,
+                right + VIEW_MARGIN, top + VIEW_MARGIN)
+
+    boss = world.boss
+    if boss is not None:
+        boss = (boss.prev_x, boss.prev_y, boss.x, boss.y, boss.angle, boss.radius,
+                boss.health, boss.max_health, WHITE if boss.flashing else boss.color)
+
+    circles, glyphs = pack_circles(world, view)
+    return RenderFrame(world, tick, boss, pack_enemies(world, view), circles, glyphs,
+                       pack_particles(world, view))
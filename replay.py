@@ -0,0 +1,204 @@
+import argparse
+import hashlib
+import struct
+
+from swarm import GAME_MODES
+from waves import WaveScheduler, load_timeline
+from world import EFFECTS, SCREEN_WIDTH, SCREEN_HEIGHT, Inputs
+
+# Input recordings. A file is a header (magic, version, seed, game mode, world
+# width and height), one record per tick, and a footer holding the tick count
+# and a hash of the final world state. Each tick record is a flag byte,
+# followed by the aim angle and/or delta time only when they changed since
+# the previous tick:
+#
+#   bit 0-3  up / down / left / right
+#   bit 4    shoot
+#   bit 5    a float64 aim angle follows
+#   bit 6    a float64 delta time follows
+#   bit 7    the game was restarted before this tick
+#
+#   python replay.py RECORDING [WAVES]   replay headless and check the hash
+#   python replay.py --check             record a short game, clicks and all,
+#                                        through the window and replay it
+
+MAGIC = b"SSRP"
+VERSION = 3
+HEADER = struct.Struct("<4sHQBII")
+FOOTER = struct.Struct("<I32s")
+FLOAT = struct.Struct("<d")
+STATE = struct.Struct("<11d")
+ENEMY_STATE = struct.Struct("<4d")
+POWERUP_STATE = struct.Struct("<2d")
+BOSS_STATE = struct.Struct("<4d")
+
+UP, DOWN, LEFT, RIGHT, SHOOT, HAS_ANGLE, HAS_DT, RESTART = (1 << i for i in range(8))
+
+MODES = list(GAME_MODES)
+
+
+def state_hash(world):
+    # numbers are hashed as packed doubles, so 0 and 0.0 (say, a fresh world
+    # and one restored from a snapshot) hash the same
+    h = hashlib.sha256()
+    h.update(STATE.pack(
+        world.player_x, world.player_y, world.player_angle, world.health,
+        world.score, world.game_over, world.timers.time, world.shoot_ready_at,
+        world.next_spawn_at, *(world.effects.get(name, 0.0) for name in EFFECTS),
+    ))
+    for enemy in world.enemies:
+        h.update(ENEMY_STATE.pack(enemy.x, enemy.y, enemy.health, enemy.shoot_at))
+        h.update(enemy.enemy_type.encode())
+    for powerup in world.powerups:
+        h.update(POWERUP_STATE.pack(powerup.x, powerup.y))
+        h.update(powerup.type.encode())
+    boss = world.boss
+    if boss:
+        h.update(BOSS_STATE.pack(boss.x, boss.y, boss.health, boss.phase))
+        h.update(struct.pack(f"<{len(boss.volley_at)}d", *boss.volley_at))
+    for store in (world.projectiles, world.swarm):
+        if store is not None:
+            for column in store.columns():
+                h.update(column[:store.count].tobytes())
+    return h.digest()
+
+
+class InputRecorder:
+    def __init__(self, path, seed, mode="classic", width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, MODES.index(mode), width, height))
+        self.ticks = 0
+        self.last_angle = None
+        self.last_dt = None
+        self.restarted = False
+
+    def restart(self):
+        # the world resets its aim on restart, so the next angle is always written
+        self.restarted = True
+        self.last_angle = None
+
+    def record(self, delta_time, inputs):
+        flags = ((UP if inputs.up else 0) | (DOWN if inputs.down else 0) |
+                 (LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) |
+                 (SHOOT if inputs.shoot else 0))
+        extra = b""
+        if inputs.angle is not None and inputs.angle != self.last_angle:
+            flags |= HAS_ANGLE
+            extra += FLOAT.pack(inputs.angle)
+            self.last_angle = inputs.angle
+        if delta_time != self.last_dt:
+            flags |= HAS_DT
+            extra += FLOAT.pack(delta_time)
+            self.last_dt = delta_time
+        if self.restarted:
+            flags |= RESTART
+            self.restarted = False
+        self.file.write(bytes((flags,)) + extra)
+        self.ticks += 1
+
+    def close(self, world):
+        self.file.write(FOOTER.pack(self.ticks, state_hash(world)))
+        self.file.close()
+
+
+class InputReplay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, self.seed, mode, self.width, self.height = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} recording")
+        self.mode = MODES[mode]
+        self.world_size = (self.width, self.height)
+        self.ticks, self.final_hash = FOOTER.unpack_from(data, len(data) - FOOTER.size)
+        self.body = data[HEADER.size:len(data) - FOOTER.size]
+
+    def __iter__(self):
+        # yields (restart, delta_time, inputs) for each recorded tick
+        body = self.body
+        pos = 0
+        delta_time = None
+        while pos < len(body):
+            flags = body[pos]
+            pos += 1
+            angle = None
+            if flags & HAS_ANGLE:
+                angle = FLOAT.unpack_from(body, pos)[0]
+                pos += FLOAT.size
+            if flags & HAS_DT:
+                delta_time = FLOAT.unpack_from(body, pos)[0]
+                pos += FLOAT.size
+            yield bool(flags & RESTART), delta_time, Inputs(
+                up=bool(flags & UP), down=bool(flags & DOWN),
+                left=bool(flags & LEFT), right=bool(flags & RIGHT),
+                shoot=bool(flags & SHOOT), angle=angle,
+            )
+
+
+def run_headless(path, waves_path=None):
+    # recordings don't carry the wave timeline; pass the same one again
+    replay = InputReplay(path)
+    world = GAME_MODES[replay.mode](seed=replay.seed, width=replay.width,
+                                    height=replay.height)
+    if waves_path:
+        world.waves = WaveScheduler(load_timeline(waves_path), world.seed)
+    for restart, delta_time, inputs in replay:
+        if restart:
+            world.restart()
+        world.step(delta_time, inputs)
+    return world, state_hash(world) == replay.final_hash
+
+
+def run_check(ticks=240):
+    # a short game played through the window - keys, aim and a left click,
+    # each delivered as a pyglet event so a handler under the wrong name is
+    # never called - must replay to the same final state. The click is the
+    # only way of shooting here, so a lost click shows up as no bullets.
+    import os
+    import tempfile
+    import arcade
+    from window import GameWindow
+
+    path = os.path.join(tempfile.mkdtemp(), "check.ssrp")
+    window = GameWindow(seed=7, record_path=path)
+    shot = False
+    for tick in range(ticks):
+        if tick == 20:
+            window.dispatch_event("on_mouse_motion", 700, 450, 0, 0)
+            window.dispatch_event("on_mouse_press", 700, 450, arcade.MOUSE_BUTTON_LEFT, 0)
+        if tick == 60:
+            window.dispatch_event("on_key_press", arcade.key.W, 0)
+        if tick == 120:
+            window.dispatch_event("on_key_release", arcade.key.W, 0)
+        window.dispatch_events()
+        window.on_update(1 / 60)
+        shot = shot or bool(window.world.bullets)
+    window.on_close()
+    world, ok = run_headless(path)
+    print(f"click {'fired' if shot else 'LOST'}, score {world.score} "
+          f"hash {'ok' if ok else 'MISMATCH'}")
+    return 0 if shot and ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay a recording headless and check "
+                                                 "its final hash")
+    parser.add_argument("recording", nargs="?")
+    parser.add_argument("waves", nargs="?",
+                        help="the wave timeline the recording was made with, if any")
+    parser.add_argument("--check", action="store_true",
+                        help="record a short game through the window, clicks and all, "
+                             "and replay it instead")
+    args = parser.parse_args()
+    if args.check:
+        return run_check()
+    if args.recording is None:
+        parser.error("a recording is required unless --check is given")
+    world, ok = run_headless(args.recording, args.waves)
+    print(f"score {world.score} health {world.health} "
+          f"hash {'ok' if ok else 'MISMATCH'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
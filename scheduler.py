@@ -0,0 +1,54 @@
+import heapq
+
+# Timed events on the simulation clock. Anything that should happen after a
+# delay - a shooter's next shot, a boss volley, the end of a powerup, the
+# next timed spawn - is a deadline pushed onto one heap, and a tick pops only
+# what has come due instead of counting every timer down.
+#
+# Cancelling is lazy: whoever schedules an event also keeps its deadline,
+# and an event whose deadline no longer matches the owner's (or whose owner
+# is gone) is dropped when it comes up. Rescheduling is storing a new
+# deadline and pushing again. Because every live event mirrors a deadline
+# some entity holds, the heap itself never needs saving: World.rebuild_timers()
+# refills it from those deadlines (see snapshot.py).
+
+
+class Scheduler:
+    def __init__(self):
+        self.time = 0.0
+        self.heap = []
+        self.pushed = 0     # breaks ties so targets are never compared
+
+    def __len__(self):
+        return len(self.heap)
+
+    def at(self, deadline, kind, target=None):
+        heapq.heappush(self.heap, (deadline, self.pushed, kind, target))
+        self.pushed += 1
+
+    def after(self, delay, kind, target=None):
+        deadline = self.time + delay
+        self.at(deadline, kind, target)
+        return deadline
+
+    def advance(self, delta_time):
+        self.time += delta_time
+
+    def due(self):
+        # pops everything at or before the current time, as
+        # [(deadline, kind, target)] in no particular order for equal deadlines
+        heap = self.heap
+        now = self.time
+        out = []
+        while heap and heap[0][0] <= now:
+            deadline, _, kind, target = heapq.heappop(heap)
+            out.append((deadline, kind, target))
+        return out
+
+    def clear(self):
+        self.heap.clear()
+        self.pushed = 0
+
+    def reset(self):
+        self.clear()
+        self.time = 0.0
@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import struct
+import zlib
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+from projectiles import OWNER_PLAYER
+from replay import UP, DOWN, LEFT, RIGHT, SHOOT, RESTART
+from timestep import SIM_HZ
+from waves import WaveScheduler, load_timeline
+from world import ENEMY_TYPES, POWERUP_TYPES, World, Inputs
+
+# Authoritative game server. The World lives here and is stepped at a fixed
+# tick rate, with the same rules as GameWindow.on_update; clients only send
+# inputs and draw what comes back. Everything goes over UDP.
+#
+# Client -> server: one INPUT datagram per tick carrying the last snapshot
+# tick the client received (its ack) plus its buttons and aim. The first
+# client to say hello flies the ship; everyone else spectates.
+#
+# Server -> client: one SNAPSHOT datagram per tick. Each tick the world is
+# quantized into a table per kind of entity (sorted ids + int16 fields: 1/8 px
+# positions, 1/65536 turn angles). A client is sent only the difference
+# between the current tables and the tables of the tick it last acked - ids
+# that went away, and rows that are new or changed - zlib-compressed. Clients
+# that haven't acked anything still held (or anything at all) get a full
+# snapshot against an empty base. Clients sharing an ack share one packet.
+
+PORT = 7777
+QUANT = 8
+ANGLE_QUANT = 65536 / 360
+HISTORY = 64             # ticks of quantized tables kept as delta bases
+CLIENT_TIMEOUT = 5.0     # seconds without a datagram before a client is dropped
+TICK_COST_WINDOW = 3600  # tick timings kept for reporting
+MAX_DATAGRAM = 65507     # largest UDP payload; bigger snapshots are not sent
+
+HELLO, INPUT, BYE, SNAPSHOT = range(4)
+CLIENT_MESSAGE = struct.Struct("<BIBf")    # kind, ack tick, flags, aim angle
+SNAPSHOT_HEAD = struct.Struct("<BII")      # kind, tick, base tick
+PLAYER = struct.Struct("<hhHhiB")          # x, y, angle, health, score, game over
+COUNTS = struct.Struct("<II")              # changed rows, removed ids
+
+# per kind: the int16 fields of a row
+KINDS = {
+    "enemies": ("x", "y", "angle", "health", "type"),
+    "bullets": ("x", "y", "vx", "vy"),
+    "enemy_bullets": ("x", "y", "vx", "vy", "owner", "radius"),
+    "powerups": ("x", "y", "type"),
+    "boss": ("x", "y", "angle", "health", "flashing"),
+}
+
+
+def empty_table(kind):
+    return np.empty(0, dtype=np.int64), np.empty((0, len(KINDS[kind])), dtype=np.int16)
+
+
+EMPTY = {kind: empty_table(kind) for kind in KINDS}
+
+
+def table(ids, *fields):
+    # rows sorted by id; positions and speeds are already scaled by QUANT
+    ids = np.asarray(ids, dtype=np.int64)
+    columns = np.empty((len(ids), len(fields)), dtype=np.int16)
+    for i, field in enumerate(fields):
+        columns[:, i] = np.clip(np.rint(field), -32768, 32767)
+    order = np.argsort(ids, kind="stable")
+    return ids[order], columns[order]
+
+
+def quantize(world):
+    enemies = world.enemies.items
+    powerups = world.powerups.items
+    store = world.projectiles
+    n = store.count
+    x = store.x[:n] * QUANT
+    y = store.y[:n] * QUANT
+    vx = store.vx[:n] * QUANT
+    vy = store.vy[:n] * QUANT
+    mine = store.owner[:n] == OWNER_PLAYER
+    hostile = ~mine
+    boss = world.boss
+
+    types = ENEMY_TYPES.index
+    tables = {
+        "enemies": table(
+            [e.handle for e in enemies],
+            [e.x * QUANT for e in enemies], [e.y * QUANT for e in enemies],
+            [(e.angle % 360) * ANGLE_QUANT - 32768 for e in enemies],
+            [e.health for e in enemies], [types(e.enemy_type) for e in enemies]),
+        "bullets": table(store.id[:n][mine], x[mine], y[mine], vx[mine], vy[mine]),
+        "enemy_bullets": table(store.id[:n][hostile], x[hostile], y[hostile], vx[hostile],
+                               vy[hostile], store.owner[:n][hostile],
+                               store.radius[:n][hostile] * QUANT),
+        "powerups": table(
+            [p.handle for p in powerups],
+            [p.x * QUANT for p in powerups], [p.y * QUANT for p in powerups],
+            [POWERUP_TYPES.index(p.type) for p in powerups]),
+        "boss": table([0], [boss.x * QUANT], [boss.y * QUANT],
+                      [(boss.angle % 360) * ANGLE_QUANT - 32768], [boss.health],
+                      [boss.flashing]) if boss is not None else EMPTY["boss"],
+    }
+    player = PLAYER.pack(
+        int(np.clip(round(world.player_x * QUANT), -32768, 32767)),
+        int(np.clip(round(world.player_y * QUANT), -32768, 32767)),
+        int((world.player_angle % 360) * ANGLE_QUANT) & 0xFFFF,
+        max(-32768, min(32767, world.health)), world.score, world.game_over)
+    return player, tables
+
+
+def diff(base, current):
+    # ids in base that are gone, and the rows of current that base lacks
+    base_ids, base_fields = base
+    ids, fields = current
+    if len(base_ids) == 0:
+        return base_ids, ids, fields
+    at = np.minimum(np.searchsorted(base_ids, ids), len(base_ids) - 1)
+    same = base_ids[at] == ids
+    same &= (base_fields[at] == fields).all(axis=1)
+    changed = ~same
+    removed = base_ids[~np.isin(base_ids, ids, assume_unique=True)]
+    return removed, ids[changed], fields[changed]
+
+
+def encode(tick, base_tick, base, state):
+    player, tables = state
+    parts = [player]
+    for kind in KINDS:
+        removed, ids, fields = diff(base[kind], tables[kind])
+        parts.append(COUNTS.pack(len(ids), len(removed)))
+        parts.append(removed.astype("<i8").tobytes())
+        parts.append(ids.astype("<i8").tobytes())
+        parts.append(fields.astype("<i2").tobytes())
+    return SNAPSHOT_HEAD.pack(SNAPSHOT, tick, base_tick) + zlib.compress(b"".join(parts), 1)
+
+
+def decode(packet, states):
+    # -> (tick, player fields, tables) rebuilt on top of the base the packet
+    # names, or None when that base is no longer in `states`
+    kind, tick, base_tick = SNAPSHOT_HEAD.unpack_from(packet, 0)
+    if base_tick == 0:
+        base = EMPTY
+    elif base_tick in states:
+        base = states[base_tick][1]
+    else:
+        return None
+    data = zlib.decompress(packet[SNAPSHOT_HEAD.size:])
+    player = PLAYER.unpack_from(data, 0)
+    offset = PLAYER.size
+    tables = {}
+    for name, fields in KINDS.items():
+        changed, removed = COUNTS.unpack_from(data, offset)
+        offset += COUNTS.size
+        gone = np.frombuffer(data, "<i8", removed, offset)
+        offset += gone.nbytes
+        ids = np.frombuffer(data, "<i8", changed, offset)
+        offset += ids.nbytes
+        rows = np.frombuffer(data, "<i2", changed * len(fields), offset)
+        offset += rows.nbytes
+        base_ids, base_fields = base[name]
+        keep = ~np.isin(base_ids, gone) & ~np.isin(base_ids, ids)
+        merged_ids = np.concatenate([base_ids[keep], ids])
+        merged = np.concatenate([base_fields[keep], rows.reshape(changed, len(fields))])
+        order = np.argsort(merged_ids, kind="stable")
+        tables[name] = merged_ids[order], merged[order]
+    return tick, player, tables
+
+
+class Client:
+    def __init__(self, address, now):
+        self.address = address
+        self.ack = 0
+        self.last_seen = now
+        self.bytes_sent = 0
+        self.packets_sent = 0
+        self.full_snapshots = 0
+        self.oversized = 0
+
+
+class GameServer(asyncio.DatagramProtocol):
+    # `wrap`, when given, is called with the transport and returns whatever
+    # outgoing datagrams go through (see loopback.LossyLink)
+    def __init__(self, seed=None, tick_rate=SIM_HZ, waves_path=None, wrap=None):
+        self.world = World(seed=seed)
+        if waves_path:
+            self.world.waves = WaveScheduler(load_timeline(waves_path), self.world.seed)
+        self.dt = 1 / tick_rate
+        self.wrap = wrap
+        self.out = None
+        self.tick = 0
+        self.history = {}
+        self.clients = {}
+        self.pilot = None
+        self.inputs = Inputs()
+        self.restart = False
+        self.tick_costs = deque(maxlen=TICK_COST_WINDOW)
+        self.running = False
+
+    def connection_made(self, transport):
+        self.out = self.wrap(transport) if self.wrap else transport
+
+    def datagram_received(self, data, address):
+        if len(data) < CLIENT_MESSAGE.size:
+            return
+        kind, ack, flags, angle = CLIENT_MESSAGE.unpack_from(data, 0)
+        now = perf_counter()
+        client = self.clients.get(address)
+        if kind == BYE:
+            self.drop(address)
+            return
+        if client is None:
+            client = self.clients[address] = Client(address, now)
+            if self.pilot is None:
+                self.pilot = address
+        client.last_seen = now
+        # datagrams can arrive out of order; only ever move an ack forward
+        if ack > client.ack:
+            client.ack = ack
+        if kind == INPUT and address == self.pilot:
+            self.inputs = Inputs(up=bool(flags & UP), down=bool(flags & DOWN),
+                                 left=bool(flags & LEFT), right=bool(flags & RIGHT),
+                                 shoot=bool(flags & SHOOT), angle=angle)
+            self.restart = self.restart or bool(flags & RESTART)
+
+    def drop(self, address):
+        self.clients.pop(address, None)
+        if address == self.pilot:
+            self.pilot = next(iter(self.clients), None)
+            self.inputs = Inputs()
+
+    def step(self):
+        world = self.world
+        if self.restart and world.game_over:
+            world.restart()
+        self.restart = False
+        world.step(self.dt, self.inputs)
+        self.tick += 1
+
+        state = quantize(world)
+        self.history[self.tick] = state
+        self.history.pop(self.tick - HISTORY, None)
+
+        now = perf_counter()
+        packets = {}
+        for address, client in list(self.clients.items()):
+            if now - client.last_seen > CLIENT_TIMEOUT:
+                self.drop(address)
+                continue
+            base_tick = client.ack if client.ack in self.history else 0
+            packet = packets.get(base_tick)
+            if packet is None:
+                base = self.history[base_tick][1] if base_tick else EMPTY
+                packet = packets[base_tick] = encode(self.tick, base_tick, base, state)
+            if len(packet) > MAX_DATAGRAM:
+                client.oversized += 1
+                continue
+            if base_tick == 0:
+                client.full_snapshots += 1
+            self.out.sendto(packet, address)
+            client.bytes_sent += len(packet)
+            client.packets_sent += 1
+
+    async def run(self, ticks=None):
+        loop = asyncio.get_running_loop()
+        self.running = True
+        next_time = loop.time()
+        while self.running and (ticks is None or self.tick < ticks):
+            started = perf_counter()
+            self.step()
+            self.tick_costs.append(perf_counter() - started)
+            next_time += self.dt
+            delay = next_time - loop.time()
+            if delay < 0:
+                # fell behind: don't try to catch up with a burst of ticks
+                next_time = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def stop(self):
+        self.running = False
+
+
+async def serve(host, port, seed, tick_rate, waves_path):
+    loop = asyncio.get_running_loop()
+    transport, server = await loop.create_datagram_endpoint(
+        lambda: GameServer(seed, tick_rate, waves_path), local_addr=(host, port))
+    print(f"serving on {host}:{port} (seed {server.world.seed})")
+    try:
+        await server.run()
+    finally:
+        transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="authoritative space shooter server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--tick-rate", type=float, default=SIM_HZ)
+    parser.add_argument("--waves", metavar="PATH", help="JSON/TOML wave timeline")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.seed, args.tick_rate, args.waves))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import queue
+import threading
+from time import perf_counter, sleep
+
+from timestep import SIM_HZ, MAX_CATCH_UP_STEPS
+
+# The simulation on a thread of its own (GameWindow(threaded=True), --threaded).
+# The thread ticks at a fixed rate from its own clock, so ticks no longer
+# arrive in bursts of several per display frame, and packs a RenderFrame
+# (renderframe.py) after every tick. The window's draw only ever reads the
+# latest frame.
+#
+# Handing a frame over needs no lock: a frame is never written after it is
+# packed, and publishing it is a single reference store. The draw keeps
+# whatever frame it read for as long as it needs it while the next one is
+# built - double buffering, with the garbage collector taking back frames
+# nobody holds any more.
+#
+# Only this thread touches the world. Anything else that has to (restart,
+# quicksave, quickload) is queued with call() and runs between two ticks.
+#
+# Python threads share one interpreter lock, so the split buys steady
+# timing rather than parallel work: a tick and a draw still can't both run
+# Python at once, but a long draw no longer delays the ticks behind it, and
+# a burst of ticks no longer delays a frame.
+
+
+class SimThread:
+    def __init__(self, step, pack, hz=SIM_HZ, max_steps=MAX_CATCH_UP_STEPS,
+                 max_speed=False, profiler=None):
+        self.step = step            # step(dt): one tick of the game
+        self.pack = pack            # pack(tick) -> RenderFrame of the world as it is
+        self.dt = 1 / hz
+        self.max_steps = max_steps
+        self.max_speed = max_speed
+        self.profiler = profiler
+        self.tick = 0
+        self.frame = pack(0)
+        self.dropped_steps = 0
+        self.error = None
+        self.commands = queue.SimpleQueue()
+        self.running = False
+        self.thread = threading.Thread(target=self.run, name="sim", daemon=True)
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def call(self, fn):
+        # fn() runs on the sim thread before the next tick
+        self.commands.put(fn)
+
+    def alpha(self, frame, now=None):
+        # how far the display is between the frame's previous and current
+        # step, by the time since it was packed
+        if self.max_speed:
+            return 1.0
+        now = perf_counter() if now is None else now
+        return min((now - frame.time) / self.dt, 1.0)
+
+    def run(self):
+        try:
+            self.loop()
+        except BaseException as error:
+            # re-raised on the window's thread by check()
+            self.error = error
+            self.running = False
+
+    def check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def loop(self):
+        dt = self.dt
+        commands = self.commands
+        profiler = self.profiler
+        next_time = perf_counter()
+        while self.running:
+            while not commands.empty():
+                commands.get()()
+            self.step(dt)
+            self.tick += 1
+            t = profiler.mark() if profiler is not None else 0
+            frame = self.pack(self.tick)
+            if profiler is not None:
+                profiler.lap("pack", t, len(frame))
+            self.frame = frame
+
+            if self.max_speed:
+                # still give the draw a turn at the interpreter lock
+                sleep(0)
+                continue
+            next_time += dt
+            delay = next_time - perf_counter()
+            if delay > 0:
+                sleep(delay)
+            elif delay < -self.max_steps * dt:
+                # too far behind; drop the backlog rather than spiral
+                self.dropped_steps += int(-delay / dt)
+                next_time = perf_counter()
@@ -0,0 +1,367 @@
+import struct
+import zlib
+from array import array
+from collections import deque
+
+import numpy as np
+
+from swarm import GAME_MODES
+from world import ENEMY_TYPES, POWERUP_TYPES, EFFECTS, Enemy, PowerUp, Boss
+
+# Full-state snapshots. capture() packs everything the simulation reads into
+# one flat little-endian blob; restore() puts a world back exactly as it was,
+# so stepping on from a restored world matches the original run bit for bit.
+# Particles are cosmetic and are cleared instead of stored (their generator
+# state is kept, so later bursts still match). The timer heap isn't stored
+# either; it is rebuilt from the deadlines (World.rebuild_timers).
+#
+# Blob layout:
+#   HEAD      magic, version, mode, flags, seed, entity counts
+#   DOUBLES   player, sim clock and deadlines (0 for an effect that isn't
+#             running), boss, swarm spawn budget, wave clock
+#   INTS      health, score, game over, boss health/flash/phase, wave
+#             positions, next projectile id
+#   random.Random state (625 uint32 + gauss), three PCG64 states
+#   boss volley deadlines f64 + volley counts i64, one each per pattern of
+#   its phase
+#   enemies (n, 8) f64 + (n, 2) i64, powerups (n, 4) f64 + (n,) u8,
+#   projectile columns, swarm columns
+#
+# SnapshotRing keeps the last few seconds of them in one fixed bytearray:
+# every KEYFRAME_INTERVAL-th snapshot is stored whole, the ones between are
+# XORed against the previous snapshot first (unchanged bytes become zeros),
+# and everything is zlib-compressed at level 1.
+
+MAGIC = b"SSSN"
+VERSION = 5
+MODES = list(GAME_MODES)
+HEAD = struct.Struct("<4sHBBQ6I")
+DOUBLES = struct.Struct("<18d")
+INTS = struct.Struct("<10q")
+MT_STATE = struct.Struct("<625Id?")
+PCG_STATE = struct.Struct("<4QIQ")
+FILE_HEAD = struct.Struct("<4sHI")
+
+HAS_BOSS, HAS_SWARM, HAS_WAVES = 1, 2, 4
+
+ENEMY_FLOATS = 8
+ENEMY_INTS = 2
+POWERUP_FLOATS = 4
+
+KEYFRAME_INTERVAL = 60
+SNAPSHOT_BUDGET = 32 * 2 ** 20
+MASK64 = (1 << 64) - 1
+
+
+def pack_pcg(generator):
+    if generator is None:
+        return PCG_STATE.pack(0, 0, 0, 0, 0, 0)
+    state = generator.bit_generator.state
+    s = state["state"]["state"]
+    inc = state["state"]["inc"]
+    return PCG_STATE.pack(s & MASK64, s >> 64, inc & MASK64, inc >> 64,
+                          state["has_uint32"], state["uinteger"])
+
+
+def unpack_pcg(generator, data, offset):
+    s0, s1, i0, i1, has_uint32, uinteger = PCG_STATE.unpack_from(data, offset)
+    if generator is not None:
+        generator.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": s0 | s1 << 64, "inc": i0 | i1 << 64},
+            "has_uint32": has_uint32,
+            "uinteger": uinteger,
+        }
+    return offset + PCG_STATE.size
+
+
+def capture(world):
+    boss = world.boss
+    swarm = world.swarm
+    waves = world.waves
+    enemies = world.enemies.items
+    powerups = world.powerups.items
+    store = world.projectiles
+    flags = ((HAS_BOSS if boss is not None else 0) | (HAS_SWARM if swarm is not None else 0) |
+             (HAS_WAVES if waves is not None else 0))
+    parts = [
+        HEAD.pack(MAGIC, VERSION, MODES.index(world.mode), flags, world.seed,
+                  world.width, world.height, len(enemies), len(powerups), store.count,
+                  swarm.count if swarm is not None else 0),
+        DOUBLES.pack(
+            world.player_x, world.player_y, world.prev_player_x, world.prev_player_y,
+            world.player_angle, world.timers.time, world.shoot_ready_at, world.next_spawn_at,
+            *(world.effects.get(name, 0.0) for name in EFFECTS),
+            *((boss.x, boss.y, boss.prev_x, boss.prev_y, boss.angle, boss.flash_until)
+              if boss is not None else (0.0,) * 6),
+            getattr(world, "swarm_spawn_budget", 0.0),
+            waves.time if waves is not None else 0.0),
+        INTS.pack(
+            world.health, world.score, world.game_over,
+            boss.health if boss is not None else 0, boss.flashing if boss is not None else 0,
+            boss.phase if boss is not None else 0,
+            waves.next_event if waves is not None else 0,
+            waves.next_boss_time if waves is not None else 0,
+            waves.next_boss_score if waves is not None else 0,
+            store.next_id),
+    ]
+
+    version, mt, gauss = world.rng.getstate()
+    parts.append(MT_STATE.pack(*mt, gauss or 0.0, gauss is not None))
+    parts.append(pack_pcg(world.particles.rng))
+    parts.append(pack_pcg(getattr(world, "swarm_rng", None)))
+    parts.append(pack_pcg(waves.rng if waves is not None else None))
+    if boss is not None:
+        parts.append(array("d", boss.volley_at).tobytes())
+        parts.append(array("q", boss.volleys).tobytes())
+
+    if enemies:
+        parts.append(array("d", [v for e in enemies for v in (
+            e.x, e.y, e.prev_x, e.prev_y, e.angle, e.speed, e.shoot_at, e.lag)]).tobytes())
+        types = ENEMY_TYPES.index
+        parts.append(array("q", [v for e in enemies for v in (
+            e.health, types(e.enemy_type))]).tobytes())
+    if powerups:
+        parts.append(array("d", [v for p in powerups for v in (
+            p.x, p.y, p.prev_x, p.prev_y)]).tobytes())
+        types = POWERUP_TYPES.index
+        parts.append(bytes([types(p.type) for p in powerups]))
+    n = store.count
+    for column in store.columns():
+        parts.append(column[:n].tobytes())
+    if swarm is not None:
+        n = swarm.count
+        for column in swarm.columns():
+            parts.append(column[:n].tobytes())
+    return b"".join(parts)
+
+
+def restore(world, data):
+    (magic, version, mode, flags, seed, width, height, n_enemies, n_powerups, n_projectiles,
+     n_swarm) = HEAD.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} snapshot")
+    if MODES[mode] != world.mode:
+        raise ValueError(f"snapshot is from {MODES[mode]} mode, world is {world.mode}")
+    if bool(flags & HAS_WAVES) != (world.waves is not None):
+        raise ValueError("snapshot and world disagree about using a wave timeline")
+    if (width, height) != (world.width, world.height):
+        raise ValueError(f"snapshot is of a {width}x{height} world, "
+                         f"world is {world.width}x{world.height}")
+    offset = HEAD.size
+    d = DOUBLES.unpack_from(data, offset)
+    offset += DOUBLES.size
+    i = INTS.unpack_from(data, offset)
+    offset += INTS.size
+
+    world.seed = seed
+    (world.player_x, world.player_y, world.prev_player_x, world.prev_player_y,
+     world.player_angle, world.timers.time, world.shoot_ready_at, world.next_spawn_at) = d[:8]
+    world.effects = {name: until for name, until in zip(EFFECTS, d[8:10]) if until}
+    world.health, world.score = i[0], i[1]
+    world.game_over = bool(i[2])
+
+    world.boss = None
+    if flags & HAS_BOSS:
+        boss = Boss(x=d[10])
+        boss.y, boss.prev_x, boss.prev_y, boss.angle, boss.flash_until = d[11:16]
+        boss.health = i[3]
+        boss.flashing = bool(i[4])
+        boss.enter_phase(i[5], 0.0)
+        world.boss = boss
+    if world.swarm is not None:
+        world.swarm_spawn_budget = d[16]
+    waves = world.waves
+    if waves is not None:
+        waves.time = d[17]
+        waves.next_event, waves.next_boss_time, waves.next_boss_score = i[6:9]
+    world.projectiles.next_id = i[9]
+
+    *mt, gauss, has_gauss = MT_STATE.unpack_from(data, offset)
+    offset += MT_STATE.size
+    world.rng.setstate((3, tuple(mt), gauss if has_gauss else None))
+    offset = unpack_pcg(world.particles.rng, data, offset)
+    offset = unpack_pcg(getattr(world, "swarm_rng", None), data, offset)
+    offset = unpack_pcg(waves.rng if waves is not None else None, data, offset)
+    if world.boss is not None:
+        count = len(world.boss.volley_at)
+        world.boss.volley_at = np.frombuffer(data, np.float64, count, offset).tolist()
+        offset += 8 * count
+        world.boss.volleys = np.frombuffer(data, np.int64, count, offset).tolist()
+        offset += 8 * count
+
+    world.enemies.clear()
+    world.view_index.clear()
+    if n_enemies:
+        floats = np.frombuffer(data, np.float64, n_enemies * ENEMY_FLOATS, offset)
+        offset += floats.nbytes
+        ints = np.frombuffer(data, np.int64, n_enemies * ENEMY_INTS, offset)
+        offset += ints.nbytes
+        floats = floats.reshape(n_enemies, ENEMY_FLOATS).tolist()
+        ints = ints.reshape(n_enemies, ENEMY_INTS).tolist()
+        for (x, y, prev_x, prev_y, angle, speed, shoot_at, lag), (health, kind) in zip(
+                floats, ints):
+            enemy = Enemy(world.rng, x, y, ENEMY_TYPES[kind], speed)
+            enemy.prev_x = prev_x
+            enemy.prev_y = prev_y
+            enemy.angle = angle
+            enemy.shoot_at = shoot_at
+            enemy.health = health
+            enemy.lag = lag
+            world.enemies.add(enemy)
+            if lag == 0:
+                world.view_index.insert(enemy, x, y)
+
+    world.powerups.clear()
+    if n_powerups:
+        floats = np.frombuffer(data, np.float64, n_powerups * POWERUP_FLOATS, offset)
+        offset += floats.nbytes
+        kinds = data[offset:offset + n_powerups]
+        offset += n_powerups
+        for (x, y, prev_x, prev_y), kind in zip(
+                floats.reshape(n_powerups, POWERUP_FLOATS).tolist(), kinds):
+            powerup = PowerUp(x, y, POWERUP_TYPES[kind])
+            powerup.prev_x = prev_x
+            powerup.prev_y = prev_y
+            world.powerups.add(powerup)
+
+    offset = restore_columns(world.projectiles, n_projectiles, data, offset)
+    if world.swarm is not None:
+        offset = restore_columns(world.swarm, n_swarm, data, offset)
+    world.particles.clear()
+    world.rebuild_timers()
+    return offset
+
+
+def restore_columns(store, count, data, offset):
+    store.clear()
+    store.reserve(count)
+    for column in store.columns():
+        values = np.frombuffer(data, column.dtype, count, offset)
+        column[:count] = values
+        offset += values.nbytes
+    store.count = count
+    return offset
+
+
+def save(path, data):
+    packed = zlib.compress(data, 6)
+    with open(path, "wb") as f:
+        f.write(FILE_HEAD.pack(MAGIC, VERSION, len(data)))
+        f.write(packed)
+
+
+def load(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    magic, version, size = FILE_HEAD.unpack_from(raw, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} snapshot file")
+    data = zlib.decompress(raw[FILE_HEAD.size:])
+    if len(data) != size:
+        raise ValueError(f"{path} is truncated")
+    return data
+
+
+def xor_bytes(a, b):
+    # a ^ b, the shorter one padded with zeros; a delta is as long as the
+    # longer snapshot, so decoding cuts it back to the stored size
+    if len(a) < len(b):
+        a, b = b, a
+    out = np.frombuffer(a, np.uint8).copy()
+    out[:len(b)] ^= np.frombuffer(b, np.uint8)
+    return out.tobytes()
+
+
+class SnapshotRing:
+    def __init__(self, capacity=SNAPSHOT_BUDGET, keyframe_interval=KEYFRAME_INTERVAL):
+        self.buffer = bytearray(capacity)
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        # (tick, offset, packed size, snapshot size, is_keyframe), oldest
+        # first; the first one is always a keyframe so everything left can
+        # be decoded
+        self.entries = deque()
+        self.head = 0
+        self.last = None
+        self.since_keyframe = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.head = 0
+        self.last = None
+        self.since_keyframe = 0
+
+    def bytes_used(self):
+        return sum(entry[2] for entry in self.entries)
+
+    def push(self, tick, data):
+        keyframe = self.last is None or self.since_keyframe >= self.keyframe_interval - 1
+        packed = zlib.compress(data if keyframe else xor_bytes(data, self.last), 1)
+        size = len(packed)
+        if size > self.capacity:
+            raise ValueError(f"a {size} byte snapshot does not fit in the ring")
+        entries = self.entries
+        if self.head + size > self.capacity:
+            # too little room left at the end: whatever is stored past head
+            # is the oldest data, so drop it and wrap around
+            while entries and entries[0][1] >= self.head:
+                entries.popleft()
+            self.head = 0
+        start = self.head
+        end = start + size
+        # drop whatever the new entry overwrites, then any deltas left
+        # without their keyframe
+        while entries and self.overlaps(entries[0], start, end):
+            entries.popleft()
+        while entries and not entries[0][4]:
+            entries.popleft()
+        self.buffer[start:end] = packed
+        entries.append((tick, start, size, len(data), keyframe))
+        self.head = end
+        self.last = data
+        self.since_keyframe = 0 if keyframe else self.since_keyframe + 1
+
+    def overlaps(self, entry, start, end):
+        offset = entry[1]
+        return offset < end and start < offset + entry[2]
+
+    def ticks(self):
+        return [entry[0] for entry in self.entries]
+
+    def decode(self, index):
+        # walk back to the keyframe, then replay the deltas forward
+        entries = self.entries
+        first = index
+        while not entries[first][4]:
+            first -= 1
+        data = None
+        for i in range(first, index + 1):
+            tick, offset, size, length, keyframe = entries[i]
+            raw = zlib.decompress(self.buffer[offset:offset + size])
+            data = raw if keyframe else xor_bytes(data, raw)[:length]
+        return data
+
+    def rewind(self, ticks_back=1):
+        # drops the newest ticks_back snapshots and returns (tick, snapshot)
+        # for the one that is now newest, or None when there is nothing left
+        entries = self.entries
+        if len(entries) <= ticks_back:
+            return None
+        for _ in range(ticks_back):
+            entries.pop()
+        index = len(entries) - 1
+        data = self.decode(index)
+        tick, offset, size, length, keyframe = entries[index]
+        self.head = offset + size
+        self.last = data
+        # count deltas since the last keyframe so the cadence carries on
+        self.since_keyframe = 0
+        while not entries[index][4]:
+            index -= 1
+            self.since_keyframe += 1
+        return tick, data
+
@@ -0,0 +1,48 @@
+import math
+
+# Uniform grid broadphase. Items are bucketed by the cell their centre falls
+# in; query() widens the search box by the biggest radius inserted so far, so
+# every item whose circle can reach the query circle is returned exactly once.
+
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.max_radius = 0
+
+    def clear(self):
+        self.cells.clear()
+        self.max_radius = 0
+
+    def insert(self, item, x, y, radius=0):
+        key = (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [item]
+        else:
+            bucket.append(item)
+        if radius > self.max_radius:
+            self.max_radius = radius
+
+    def query(self, x, y, radius=0):
+        return self.query_rect(x - radius, y - radius, x + radius, y + radius)
+
+    def query_rect(self, left, bottom, right, top):
+        # every item filed in a cell the rectangle touches (widened by the
+        # biggest radius, as in query())
+        reach = self.max_radius
+        size = self.cell_size
+        x0 = math.floor((left - reach) / size)
+        x1 = math.floor((right + reach) / size)
+        y0 = math.floor((bottom - reach) / size)
+        y1 = math.floor((top + reach) / size)
+
+        found = []
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
@@ -0,0 +1,453 @@
+import numpy as np
+
+from projectiles import OWNER_PLAYER, OWNER_ENEMY
+from sweep import contact_times
+from world import (
+    World, PowerUp, BROADPHASE, SPAWN_SIDES, SCREEN_WIDTH, SCREEN_HEIGHT, BASE_TICK_RATE,
+    AWAKE_WIDTH, AWAKE_HEIGHT, SLEEP_STEP, ENEMY_TYPES, ENEMY_RADIUS, ENEMY_SPEED_MIN, ENEMY_SPEED_MAX, ENEMY_SHOOT_COOLDOWN,
+    ENEMY_BULLET_SPEED, PARTICLE_COUNT, PARTICLE_KILL_COUNT, POWERUP_DROP_CHANCE,
+    POWERUP_TYPES, EVENT_KILL, edge_positions,
+)
+
+# Swarm mode: thousands of enemies kept as columns of numpy arrays instead of
+# Enemy objects. Homing, separation, shooting and collisions all run over the
+# whole swarm at once, so a tick costs a handful of array passes rather than
+# one Python call per enemy.
+#
+# Separation is neighbour based: enemies are bucketed into a uniform grid
+# (CellIndex) and each one is pushed away from the others within
+# SEPARATION_RADIUS, looking at no more than SEPARATION_NEIGHBOURS per cell so
+# a crowd piled onto the player can't blow up the pair count. At 5k enemies
+# that is still ~125k pairs a tick, and it is most of the tick's cost, so the
+# per-pair work arrays are kept and reused rather than made each tick.
+#
+# bench.py --swarm puts a tick at 5k enemies at about 9 ms (p50), over half a
+# 60 fps frame before anything is drawn.
+
+SWARM_SIZE = 5000
+SWARM_SPAWN_RATE = 600          # enemies per second until the swarm is full
+SEPARATION_RADIUS = 2 * ENEMY_RADIUS
+SEPARATION_STRENGTH = 1.5
+SEPARATION_NEIGHBOURS = 8
+ENEMY_HEALTH = 3
+
+TYPE_NORMAL = ENEMY_TYPES.index("normal")
+TYPE_SHOOTER = ENEMY_TYPES.index("shooter")
+
+
+class CellIndex:
+    # enemies sorted by grid cell, so everything near a point comes out of a
+    # 3x3 block of contiguous runs. The grid has a ring of empty cells around
+    # it, so neighbour lookups never need a bounds check.
+    def __init__(self, cell_size, margin=64, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.cell_size = cell_size
+        self.origin = -margin
+        self.cols = int(np.ceil((width + 2 * margin) / cell_size)) + 2
+        self.rows = int(np.ceil((height + 2 * margin) / cell_size)) + 2
+        self.order = np.empty(0, dtype=np.intp)
+        self.keys = np.empty(0, dtype=np.intp)
+        self.start = np.zeros(self.cols * self.rows + 1, dtype=np.intp)
+        cols = self.cols
+        self.around = np.array([dy * cols + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+        # the (0, 0) cell plus the four "later" neighbours: every pair of
+        # nearby cells is visited once, from one side
+        self.forward = np.array([1, cols - 1, cols, cols + 1])
+        self.index = np.empty(0, dtype=np.intp)
+        self.first = np.empty(0, dtype=np.intp)
+        self.count = np.empty(0, dtype=np.intp)
+        self.cell = np.empty(0, dtype=np.intp)
+
+    def key(self, x, y):
+        cx = ((x - self.origin) // self.cell_size).astype(np.intp) + 1
+        cy = ((y - self.origin) // self.cell_size).astype(np.intp) + 1
+        np.clip(cx, 1, self.cols - 2, out=cx)
+        np.clip(cy, 1, self.rows - 2, out=cy)
+        return cy * self.cols + cx
+
+    def build(self, x, y):
+        key = self.key(x, y)
+        self.order = np.argsort(key, kind="stable")
+        self.keys = key[self.order]
+        counts = np.bincount(key, minlength=self.cols * self.rows)
+        self.start[0] = 0
+        np.cumsum(counts, out=self.start[1:])
+
+    def counting(self, size):
+        # 0, 1, 2, ... at least size long, kept between calls
+        if len(self.index) < size:
+            self.index = np.arange(max(size, 2 * len(self.index)))
+        return self.index[:size]
+
+    def runs(self, first, count, cap):
+        # expand (first, count) runs of sorted positions; returns which run
+        # each position came from and the position itself
+        if cap is not None:
+            np.minimum(count, cap, out=count)
+        total = int(count.sum())
+        run = np.repeat(self.counting(len(first)), count)
+        shift = np.cumsum(count)
+        np.subtract(shift, count, out=shift)
+        np.subtract(first, shift, out=shift)
+        pos = shift.take(run)
+        pos += self.counting(total)
+        return run, pos
+
+    def pairs(self, x, y, cap=None):
+        # (query, item) index pairs for every item in the 3x3 cells around
+        # each query point; item indices refer to the arrays given to build()
+        n = len(x)
+        keys = (self.key(x, y)[None, :] + self.around[:, None]).ravel()
+        first = self.start[keys]
+        run, pos = self.runs(first, self.start[keys + 1] - first, cap)
+        return run % n, self.order[pos]
+
+    def neighbours(self, cap=None):
+        # every unordered pair of built items in touching cells, once each:
+        # for each item, the rest of its own cell after it, then the whole
+        # of each "later" cell. The run tables are reused between calls.
+        n = len(self.keys)
+        runs = (len(self.forward) + 1) * n
+        if len(self.first) < runs:
+            self.first = np.empty(max(runs, 2 * len(self.first)), dtype=np.intp)
+            self.count = np.empty_like(self.first)
+            self.cell = np.empty_like(self.first)
+        first = self.first[:runs]
+        count = self.count[:runs]
+        cell = self.cell[:n]
+        start = self.start
+        np.add(self.counting(n), 1, out=first[:n])
+        np.add(self.keys, 1, out=cell)
+        start.take(cell, out=count[:n])
+        count[:n] -= first[:n]
+        for block, offset in enumerate(self.forward, 1):
+            rows = slice(block * n, (block + 1) * n)
+            np.add(self.keys, offset, out=cell)
+            start.take(cell, out=first[rows])
+            cell += 1
+            start.take(cell, out=count[rows])
+            count[rows] -= first[rows]
+        run, pos = self.runs(first, count, cap)
+        np.remainder(run, n, out=run)
+        return self.order.take(run), self.order.take(pos)
+
+
+class SwarmStore:
+    # one row per enemy; keep() compacts in place and keeps the order
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.capacity = 0
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.prev_x = np.empty(0)
+        self.prev_y = np.empty(0)
+        self.angle = np.empty(0)
+        self.speed = np.empty(0, dtype=np.float32)
+        self.shoot_cooldown = np.empty(0)
+        self.health = np.empty(0, dtype=np.int16)
+        self.type = np.empty(0, dtype=np.int8)
+        self.lag = np.empty(0)    # time banked while asleep
+        self.reserve(capacity)
+
+    def columns(self):
+        return (self.x, self.y, self.prev_x, self.prev_y, self.angle, self.speed,
+                self.shoot_cooldown, self.health, self.type, self.lag)
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, self.capacity * 2)
+        n = self.count
+        for name in ("x", "y", "prev_x", "prev_y", "angle", "speed",
+                     "shoot_cooldown", "health", "type", "lag"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def spawn_many(self, x, y, types, speed):
+        k = len(x)
+        if k == 0:
+            return
+        start = self.count
+        self.reserve(start + k)
+        end = start + k
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.prev_x[start:end] = x
+        self.prev_y[start:end] = y
+        self.angle[start:end] = 0
+        self.speed[start:end] = speed
+        self.shoot_cooldown[start:end] = 0
+        self.health[start:end] = ENEMY_HEALTH
+        self.type[start:end] = types
+        self.lag[start:end] = 0
+        self.count = end
+
+    def keep(self, mask):
+        n = self.count
+        k = int(np.count_nonzero(mask))
+        if k == n:
+            return
+        kept = np.flatnonzero(mask)
+        for column in self.columns():
+            column[:k] = column[kept]
+        self.count = k
+
+    def clear(self):
+        self.count = 0
+
+    def views(self):
+        return [SwarmView(self, i) for i in range(self.count)]
+
+
+class SwarmView:
+    # read-only stand-in for an Enemy, for the immediate-mode draw functions
+    __slots__ = ("store", "index")
+
+    radius = ENEMY_RADIUS
+    max_health = ENEMY_HEALTH
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.store.x[self.index])
+
+    @property
+    def y(self):
+        return float(self.store.y[self.index])
+
+    @property
+    def angle(self):
+        return float(self.store.angle[self.index])
+
+    @property
+    def health(self):
+        return int(self.store.health[self.index])
+
+    @property
+    def enemy_type(self):
+        return ENEMY_TYPES[self.store.type[self.index]]
+
+
+class SwarmWorld(World):
+    mode = "swarm"
+    timed_spawns = False    # spawns come from swarm_spawn_budget instead
+
+    def __init__(self, broadphase=BROADPHASE, seed=None, profiler=None, size=SWARM_SIZE,
+                 width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        super().__init__(broadphase, seed, profiler, width, height)
+        self.swarm = SwarmStore()
+        self.swarm_size = size
+        self.swarm_spawn_budget = 0.0
+        self.swarm_rng = np.random.default_rng((self.seed, 1))
+        self.cells = CellIndex(SEPARATION_RADIUS, width=width, height=height)
+        self.pair_capacity = 0
+        self.pair_floats = [np.empty(0) for _ in range(5)]
+        self.pair_masks = [np.empty(0, dtype=bool) for _ in range(2)]
+
+    def enemy_count(self):
+        return self.swarm.count
+
+    def spawn_enemies(self, delta_time):
+        if self.waves is not None:
+            super().spawn_enemies(delta_time)
+            return
+        self.swarm_spawn_budget += SWARM_SPAWN_RATE * delta_time
+        count = min(int(self.swarm_spawn_budget), self.swarm_size - self.swarm.count)
+        self.swarm_spawn_budget -= int(self.swarm_spawn_budget)
+        if count <= 0:
+            return
+        rng = self.swarm_rng
+        x, y = edge_positions(rng, rng.integers(0, len(SPAWN_SIDES), count),
+                              self.width, self.height)
+        self.swarm.spawn_many(x, y, rng.integers(0, len(ENEMY_TYPES), count),
+                              rng.uniform(ENEMY_SPEED_MIN, ENEMY_SPEED_MAX, count))
+
+    def spawn_batch(self, x, y, types, speed):
+        self.swarm.spawn_many(x, y, types, speed)
+
+    def pair_scratch(self, count):
+        # work arrays for the separation pass, one slot per neighbour pair;
+        # grown like SwarmStore's columns and reused every tick after that
+        if count > self.pair_capacity:
+            self.pair_capacity = max(count, 2 * self.pair_capacity)
+            self.pair_floats = [np.empty(self.pair_capacity) for _ in range(5)]
+            self.pair_masks = [np.empty(self.pair_capacity, dtype=bool) for _ in range(2)]
+        return ([a[:count] for a in self.pair_floats],
+                [a[:count] for a in self.pair_masks])
+
+    def separation(self, x, y):
+        n = len(x)
+        self.cells.build(x, y)
+        i, j = self.cells.neighbours(SEPARATION_NEIGHBOURS)
+        (dx, dy, d, push, tmp), (close, apart) = self.pair_scratch(len(i))
+        np.take(x, i, out=dx)
+        np.subtract(dx, np.take(x, j, out=tmp), out=dx)
+        np.take(y, i, out=dy)
+        np.subtract(dy, np.take(y, j, out=tmp), out=dy)
+        np.multiply(dx, dx, out=d)
+        np.add(d, np.multiply(dy, dy, out=tmp), out=d)
+        np.less(d, SEPARATION_RADIUS ** 2, out=close)
+        np.greater(d, 1e-12, out=apart)
+        np.logical_and(close, apart, out=close)
+        np.sqrt(d, out=d)
+        # linear falloff: full push when touching, none at the radius; each
+        # pair pushes both of its enemies apart equally. Pairs that aren't
+        # close push by zero rather than being filtered out.
+        np.subtract(SEPARATION_RADIUS, d, out=tmp)
+        np.multiply(d, SEPARATION_RADIUS, out=d)
+        push.fill(0)
+        np.divide(tmp, d, out=push, where=close)
+        px = np.multiply(dx, push, out=dx)
+        py = np.multiply(dy, push, out=dy)
+        fx = np.bincount(i, px, minlength=n) - np.bincount(j, px, minlength=n)
+        fy = np.bincount(i, py, minlength=n) - np.bincount(j, py, minlength=n)
+        return fx, fy
+
+    def update_enemies(self, delta_time):
+        swarm = self.swarm
+        n = swarm.count
+        if n == 0:
+            return
+        x = swarm.x[:n]
+        y = swarm.y[:n]
+        swarm.prev_x[:n] = x
+        swarm.prev_y[:n] = y
+
+        # far enemies sleep as in the classic mode (see world.py): only the
+        # rows that move this tick are gathered, moved and written back
+        lag = swarm.lag[:n]
+        lag += delta_time
+        moving = (np.abs(x - self.player_x) <= AWAKE_WIDTH) & \
+            (np.abs(y - self.player_y) <= AWAKE_HEIGHT)
+        moving |= lag >= SLEEP_STEP
+        m = slice(None) if moving.all() else np.flatnonzero(moving)
+        mx = x[m]
+        my = y[m]
+        dt = lag[m]
+
+        dx = self.player_x - mx
+        dy = self.player_y - my
+        dist = np.maximum(np.hypot(dx, dy), 1e-9)
+        swarm.angle[:n][m] = np.degrees(np.arctan2(dy, dx))
+
+        sx, sy = self.separation(mx, my)
+        step = swarm.speed[:n][m] * (dt * BASE_TICK_RATE)
+        x[m] = mx + (dx / dist + sx * SEPARATION_STRENGTH) * step
+        y[m] = my + (dy / dist + sy * SEPARATION_STRENGTH) * step
+
+        # shooters fire along their homing direction
+        cooldown = swarm.shoot_cooldown[:n][m]
+        shooter = swarm.type[:n][m] == TYPE_SHOOTER
+        cooldown[shooter] -= dt[shooter]
+        ready = np.flatnonzero(shooter & (cooldown <= 0))
+        if len(ready):
+            cooldown[ready] = ENEMY_SHOOT_COOLDOWN
+            ux = dx[ready] / dist[ready]
+            uy = dy[ready] / dist[ready]
+            self.projectiles.spawn_many(
+                x[m][ready] + ux * ENEMY_RADIUS, y[m][ready] + uy * ENEMY_RADIUS,
+                ux * ENEMY_BULLET_SPEED, uy * ENEMY_BULLET_SPEED, 6, 10, OWNER_ENEMY)
+        swarm.shoot_cooldown[:n][m] = cooldown
+        lag[m] = 0
+
+        # contact with the player, then anything that wandered off
+        touching = np.hypot(x - self.player_x, y - self.player_y) < \
+            ENEMY_RADIUS + self.player_radius
+        hits = int(np.count_nonzero(touching))
+        if hits:
+            self.hurt_player(10 * hits)
+            if self.health <= 0:
+                self.game_over = True
+        off = (x < -50) | (x > self.width + 50) | (y < -50) | (y > self.height + 50)
+        swarm.keep(~(touching | off))
+
+    def collide_bullets_enemies(self):
+        # swept like the classic mode (see sweep.py): candidates come from a
+        # grid with cells twice the reach, looked up at points no more than a
+        # cell apart along each bullet's path, then get the exact test
+        swarm = self.swarm
+        n = swarm.count
+        store = self.projectiles
+        bullets = store.owned_by(OWNER_PLAYER)
+        if n == 0 or len(bullets) == 0:
+            return
+        x = swarm.x[:n]
+        y = swarm.y[:n]
+        px = swarm.prev_x[:n]
+        py = swarm.prev_y[:n]
+        bx = store.x[bullets]
+        by = store.y[bullets]
+        bpx = store.prev_x[bullets]
+        bpy = store.prev_y[bullets]
+        br = store.radius[bullets]
+        moved = float(np.hypot(x - px, y - py).max())
+        cell = 2 * (float(br.max()) + ENEMY_RADIUS + moved)
+        cells = CellIndex(cell, width=self.width, height=self.height)
+        cells.build(x, y)
+
+        samples = (np.hypot(bx - bpx, by - bpy) // cell).astype(np.intp) + 2
+        owner = np.repeat(np.arange(len(bullets)), samples)
+        u = (np.arange(len(owner)) - np.repeat(np.cumsum(samples) - samples, samples)) / \
+            (samples[owner] - 1)
+        sx = bpx[owner] + (bx - bpx)[owner] * u
+        sy = bpy[owner] + (by - bpy)[owner] * u
+        s, e = cells.pairs(sx, sy)
+        b = owner[s]
+        pair = np.unique(b * n + e)
+        b = pair // n
+        e = pair % n
+
+        t = contact_times(bpx[b] - px[e], bpy[b] - py[e], bx[b] - x[e], by[b] - y[e],
+                          br[b] + ENEMY_RADIUS)
+        hit = t <= 1
+        b = b[hit]
+        e = e[hit]
+        t = t[hit]
+        if len(b) == 0:
+            return
+
+        # each bullet hits the enemy it touches first, ties going to the
+        # earlier one in swarm order
+        order = np.lexsort((e, t, b))
+        b = b[order]
+        e = e[order]
+        first = np.concatenate(([True], b[1:] != b[:-1]))
+        b = b[first]
+        e = e[first]
+
+        health = swarm.health[:n]
+        np.subtract.at(health, e, 1)
+        killed = health <= 0
+        if self.events is not None:
+            for enemy in np.flatnonzero(killed).tolist():
+                self.publish(EVENT_KILL, float(x[enemy]), float(y[enemy]), 10,
+                             int(swarm.type[enemy]))
+        self.add_score(10 * int(np.count_nonzero(killed)))
+
+        rng = self.rng
+        particles = self.particles
+        for enemy in e.tolist():
+            ex = float(x[enemy])
+            ey = float(y[enemy])
+            particles.emit(ex, ey, PARTICLE_KILL_COUNT if killed[enemy] else PARTICLE_COUNT)
+            if rng.random() < POWERUP_DROP_CHANCE:
+                self.powerups.add(PowerUp(ex, ey, rng.choice(POWERUP_TYPES)))
+
+        swarm.keep(~killed)
+        store.remove(bullets[b])
+
+    def restart(self):
+        super().restart()
+        self.swarm.clear()
+        self.swarm_spawn_budget = 0.0
+
+
+GAME_MODES = {
+    "classic": World,
+    "swarm": SwarmWorld,
+}
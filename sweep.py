@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+# Swept circle tests. Over one step a projectile moves in a straight line from
+# (prev_x, prev_y) to (x, y) and so (near enough) does whatever it might hit,
+# so the question "did they touch at any point during the step" reduces to a
+# segment against a circle: the projectile's path relative to the target,
+# from a = start offset to b = end offset, against a circle of radius r (the
+# two radii added) at the origin. A hit no longer depends on where the step
+# boundaries happen to fall, so a fast bullet can't skip over a small enemy
+# at a low tick rate.
+#
+# Both functions return the fraction of the step at which the two first
+# touch, 0 if they already overlap at the start; inf (or None) for a miss.
+
+
+def contact_time(ax, ay, bx, by, r):
+    dx = bx - ax
+    dy = by - ay
+    c = ax * ax + ay * ay - r * r
+    if c < 0:
+        return 0.0
+    a = dx * dx + dy * dy
+    half_b = ax * dx + ay * dy
+    if a == 0 or half_b >= 0:
+        return None
+    disc = half_b * half_b - a * c
+    if disc <= 0:
+        return None
+    t = (-half_b - math.sqrt(disc)) / a
+    return t if t <= 1 else None
+
+
+def contact_times(ax, ay, bx, by, r):
+    dx = bx - ax
+    dy = by - ay
+    c = ax * ax + ay * ay - r * r
+    a = dx * dx + dy * dy
+    half_b = ax * dx + ay * dy
+    disc = half_b * half_b - a * c
+    approaching = (half_b < 0) & (disc > 0)
+    t = np.full(len(c), np.inf)
+    root = np.flatnonzero(approaching)
+    t[root] = (-half_b[root] - np.sqrt(disc[root])) / a[root]
+    t[t > 1] = np.inf
+    t[c < 0] = 0.0
+    return t
+
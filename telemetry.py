@@ -0,0 +1,258 @@
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+from world import (ENEMY_TYPES, POWERUP_TYPES, EVENT_KILL, EVENT_DAMAGE, EVENT_POWERUP,
+                   EVENT_BOSS_SPAWN, EVENT_BOSS_KILL, EVENT_SCORE, EVENT_RESTART)
+
+# Gameplay telemetry. The world publishes an event at each of its mutation
+# sites (World.publish: kills, damage taken, powerup pickups, boss spawn and
+# kill, score changes, restarts) into an EventBus; a TelemetryWriter thread
+# drains the bus in batches and writes them gzip-compressed to a series of
+# files, starting a new one every ROTATE_BYTES.
+#
+# The thread that steps the world never waits on any of it. publish() is a
+# length check and a deque append - both atomic in CPython, and safe without
+# a lock with one thread appending and one popping - and the writer polls
+# instead of being signalled. When the bus is full the event is dropped and
+# counted rather than waited for; a batch the disk refuses is counted as
+# lost. Both counts are reported when the writer closes.
+#
+# An event is (kind, sim time, x, y, amount, detail); what amount and detail
+# mean depends on the kind (EVENTS). Two formats:
+#
+#   jsonl   one JSON object per line, the first line the session header
+#   binary  MAGIC, a u32-length JSON header, then EVENT records
+#
+# read_events() reads either back.
+
+BUS_CAPACITY = 65536
+BATCH_SIZE = 4096
+FLUSH_INTERVAL = 0.5        # seconds between the writer's passes over the bus
+ROTATE_BYTES = 8 * 2 ** 20  # compressed bytes per file before starting the next
+KEEP_FILES = 0              # newest files kept per session; 0 keeps them all
+FORMATS = {"jsonl": ".jsonl.gz", "binary": ".bin.gz"}
+
+MAGIC = b"SSEV\x01"
+EVENT = struct.Struct("<Bdffii")    # kind, time, x, y, amount, detail
+
+# kind -> (name, what amount is, what detail is)
+EVENTS = {
+    EVENT_KILL: ("kill", "points", "enemy_type"),
+    EVENT_DAMAGE: ("damage", "damage", "health"),
+    EVENT_POWERUP: ("powerup", None, "powerup_type"),
+    EVENT_BOSS_SPAWN: ("boss_spawn", "health", None),
+    EVENT_BOSS_KILL: ("boss_kill", "points", None),
+    EVENT_SCORE: ("score", "delta", "score"),
+    EVENT_RESTART: ("restart", None, None),
+}
+# details that are an index into a list of names
+DETAIL_NAMES = {"enemy_type": ENEMY_TYPES, "powerup_type": POWERUP_TYPES}
+
+
+class EventBus:
+    def __init__(self, capacity=BUS_CAPACITY):
+        self.capacity = capacity
+        self.queue = deque()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, kind, t, x, y, amount=0, detail=0):
+        # the writer only ever shrinks the queue, so a length read here can
+        # be stale but never lets it grow past capacity
+        if len(self.queue) >= self.capacity:
+            self.dropped += 1
+            return
+        self.queue.append((kind, t, x, y, amount, detail))
+        self.published += 1
+
+    def take(self, limit):
+        queue = self.queue
+        batch = []
+        while queue and len(batch) < limit:
+            batch.append(queue.popleft())
+        return batch
+
+
+def event_dict(event):
+    kind, t, x, y, amount, detail = event
+    name, amount_key, detail_key = EVENTS[kind]
+    out = {"event": name, "t": round(t, 6), "x": round(x, 2), "y": round(y, 2)}
+    if amount_key:
+        out[amount_key] = amount
+    if detail_key:
+        names = DETAIL_NAMES.get(detail_key)
+        out[detail_key] = names[detail] if names else detail
+    return out
+
+
+def encode_jsonl(batch):
+    return "".join(json.dumps(event_dict(e), separators=(",", ":")) + "\n"
+                   for e in batch).encode()
+
+
+def encode_binary(batch):
+    pack = EVENT.pack
+    return b"".join(pack(kind, t, x, y, amount, detail)
+                    for kind, t, x, y, amount, detail in batch)
+
+
+def session_name(seed=None):
+    now = time.time()
+    name = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"{now % 1:.3f}"[1:]
+    return f"{name}-{seed}" if seed is not None else name
+
+
+class TelemetryWriter:
+    def __init__(self, bus, directory, fmt="jsonl", session=None, header=None,
+                 rotate_bytes=ROTATE_BYTES, keep_files=KEEP_FILES,
+                 interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown telemetry format {fmt!r}; expected one of "
+                             f"{sorted(FORMATS)}")
+        self.bus = bus
+        self.directory = directory
+        self.fmt = fmt
+        self.encode = encode_jsonl if fmt == "jsonl" else encode_binary
+        self.session = session or session_name()
+        self.header = dict(header or {}, session=self.session, format=fmt)
+        self.rotate_bytes = rotate_bytes
+        self.keep_files = keep_files
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self.raw = None
+        self.out = None
+        self.files = []         # paths still on disk, oldest first
+        self.opened = 0
+        self.written = 0
+        self.batches = 0
+        self.lost = 0
+        self.write_errors = 0
+        self.last_error = None
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread.start()
+
+    def close(self):
+        # stops the thread after one last pass, so nothing already on the bus
+        # is left behind
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        else:
+            self.drain()
+            self.close_file()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.drain()
+        self.drain()
+        self.close_file()
+
+    def drain(self):
+        while True:
+            batch = self.bus.take(self.batch_size)
+            if not batch:
+                return
+            self.write(batch)
+
+    def write(self, batch):
+        try:
+            if self.out is None:
+                self.open_file()
+            self.out.write(self.encode(batch))
+            # a sync flush per batch keeps everything so far readable even
+            # if the game dies without closing the file
+            self.out.flush()
+        except OSError as error:
+            # reported by summary(); never printed from this thread
+            self.write_errors += 1
+            self.last_error = error
+            self.lost += len(batch)
+            self.close_file()
+            return
+        self.written += len(batch)
+        self.batches += 1
+        if self.raw.tell() >= self.rotate_bytes:
+            self.close_file()
+
+    def open_file(self):
+        index = self.opened
+        self.opened += 1
+        path = os.path.join(self.directory,
+                            f"{self.session}-{index:04d}{FORMATS[self.fmt]}")
+        # never overwrite another session's file
+        self.raw = open(path, "xb")
+        self.out = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=6)
+        self.files.append(path)
+        header = json.dumps(dict(self.header, file=index, opened=time.time()))
+        if self.fmt == "jsonl":
+            self.out.write(header.encode() + b"\n")
+        else:
+            header = header.encode()
+            self.out.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self.prune()
+
+    def close_file(self):
+        out, raw = self.out, self.raw
+        self.out = self.raw = None
+        try:
+            if out is not None:
+                out.close()
+            if raw is not None:
+                raw.close()
+        except OSError as error:
+            self.write_errors += 1
+            self.last_error = error
+
+    def prune(self):
+        if not self.keep_files:
+            return
+        for path in self.files[:-self.keep_files]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        del self.files[:-self.keep_files]
+
+    def summary(self):
+        line = (f"telemetry: {self.written} events in {self.batches} batches, "
+                f"{self.opened} file(s) under {self.directory}; "
+                f"{self.bus.dropped} dropped (bus full), {self.lost} lost to "
+                f"{self.write_errors} write error(s)")
+        if self.last_error is not None:
+            line += f", last: {self.last_error}"
+        return line
+
+
+def start_telemetry(world, directory, fmt="jsonl", header=None):
+    # wires a new bus into the world and starts a writer for it
+    bus = world.events = EventBus()
+    writer = TelemetryWriter(bus, directory, fmt, session_name(world.seed),
+                             dict(header or {}, seed=world.seed, mode=world.mode))
+    writer.start()
+    return writer
+
+
+def read_events(path):
+    # -> (header, [event dicts]) from a file of either format
+    with gzip.open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(MAGIC):
+        offset = len(MAGIC)
+        (size,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        header = json.loads(data[offset:offset + size])
+        offset += size
+        events = [event_dict(e) for e in EVENT.iter_unpack(data[offset:])]
+        return header, events
+    lines = data.decode().splitlines()
+    return json.loads(lines[0]), [json.loads(line) for line in lines[1:]]
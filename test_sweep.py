@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+from replay import state_hash
+from world import World, Inputs, Enemy, EnemyBullet, Boss
+
+# The same encounters at 30, 60 and 240 Hz must end the same way: the swept
+# tests in sweep.py make a hit independent of where the step boundaries fall.
+
+TICK_RATES = (30, 60, 240)
+
+
+def grazing_shot(world):
+    # a bullet passing 14 px off an enemy's centre: inside the 16 px reach,
+    # but the 15.5 px chord sits between two 30 Hz steps, so a test at the
+    # step boundaries alone misses it
+    world.add_enemy(Enemy(world.rng, world.player_x + 215, world.player_y + 14, "normal", 0))
+    return Inputs(shoot=True, angle=0)
+
+
+def crossing_shot(world):
+    # an enemy homing in from the side, clipped by a shot fired ahead of it;
+    # one hit kills it
+    enemy = Enemy(world.rng, world.player_x + 120, world.player_y + 200, "normal", 3)
+    enemy.health = 1
+    world.add_enemy(enemy)
+    return Inputs(shoot=True, angle=63.5)
+
+
+def incoming_fire(world):
+    # an enemy bullet that clips the edge of the player
+    world.add_projectile(EnemyBullet(world.player_x + 300, world.player_y + 48, 180))
+    return Inputs()
+
+
+def boss_shot(world):
+    world.set_boss(Boss(x=world.player_x + 250))
+    world.boss.y = world.player_y + 90
+    world.boss.speed = 0
+    world.boss.volley_at = [math.inf] * len(world.boss.volley_at)
+    return Inputs(shoot=True, angle=20)
+
+
+def play(scenario, hz):
+    # one second of the encounter; the inputs it returns are held for the
+    # first tick only
+    world = World(seed=1)
+    world.next_spawn_at = math.inf
+    first = scenario(world)
+    for tick in range(hz):
+        world.step(1 / hz, first if tick == 0 else Inputs())
+    enemies = [e.health for e in world.enemies]
+    boss = world.boss.health if world.boss else None
+    return world.health, world.score, enemies, boss
+
+
+@pytest.mark.parametrize("scenario", [grazing_shot, crossing_shot, incoming_fire, boss_shot])
+def test_outcome_independent_of_tick_rate(scenario):
+    outcomes = {hz: play(scenario, hz) for hz in TICK_RATES}
+    assert outcomes[30] == outcomes[60] == outcomes[240]
+
+
+def test_encounters_hit():
+    # guard against all three rates agreeing on a miss
+    fresh = Enemy(x=0, y=0, enemy_type="normal", speed=0).max_health
+    assert play(grazing_shot, 60)[2][0] < fresh
+    assert play(crossing_shot, 60)[2] == []
+    assert play(incoming_fire, 60)[0] < 100
+    assert play(boss_shot, 60)[3] < Boss().max_health
+
+
+def test_grid_matches_brute_force():
+    # the spatial hash only narrows the candidates; every hit must be the
+    # one a test against every enemy finds
+    hashes = []
+    for broadphase in ("grid", "brute"):
+        world = World(broadphase=broadphase, seed=7)
+        for tick in range(1200):
+            world.step(1 / 60, Inputs(shoot=True, angle=(tick * 3) % 360))
+            world.health = 100
+        hashes.append(state_hash(world))
+    assert hashes[0] == hashes[1]
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+import arcade
+
+# arcade.draw_text lays out and rasterises its string on every call. These
+# helpers keep the laid-out arcade.Text objects around instead, and turn the
+# powerup emoji into textures once so they can be drawn from a SpriteList.
+
+TEXT_CACHE_SIZE = 64
+
+
+class TextCache:
+    # LRU of arcade.Text keyed by content and style; moving a cached label is
+    # cheap, building a new one is what we are avoiding
+    def __init__(self, capacity=TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.misses = 0
+
+    def get(self, text, color, font_size, anchor_x="left"):
+        key = (text, tuple(color), font_size, anchor_x)
+        label = self.entries.get(key)
+        if label is None:
+            self.misses += 1
+            label = arcade.Text(text, 0, 0, color, font_size, anchor_x=anchor_x)
+            self.entries[key] = label
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return label
+
+    def draw(self, text, x, y, color, font_size, anchor_x="left"):
+        label = self.get(text, color, font_size, anchor_x)
+        if label.x != x or label.y != y:
+            label.position = (x, y)
+        label.draw()
+
+
+class Hud:
+    # a single label whose layout is only redone when score or health change
+    def __init__(self):
+        self.label = arcade.Text("", 10, 10, arcade.color.WHITE, 16)
+        self.shown = None
+
+    def draw(self, score, health):
+        if self.shown != (score, health):
+            self.shown = (score, health)
+            self.label.text = f"Score: {score} Health: {health}"
+        self.label.draw()
+
+
+class GlyphSprites:
+    # every glyph is rasterised once into the default texture atlas; after
+    # that a frame of powerup icons is one SpriteList draw
+    def __init__(self, glyphs, color=arcade.color.WHITE, font_size=12):
+        self.textures = {
+            name: arcade.create_text_sprite(glyph, color, font_size).texture
+            for name, glyph in glyphs.items()
+        }
+        self.sprites = arcade.SpriteList()
+
+    def draw(self, items, offset=(-6, -6)):
+        sprites = self.sprites
+        while len(sprites) < len(items):
+            sprites.append(arcade.Sprite(next(iter(self.textures.values()))))
+        for sprite, (name, x, y) in zip(sprites, items):
+            sprite.visible = True
+            texture = self.textures[name]
+            if sprite.texture is not texture:
+                sprite.texture = texture
+            sprite.left = x + offset[0]
+            sprite.bottom = y + offset[1]
+        for sprite in sprites[len(items):]:
+            sprite.visible = False
+        sprites.draw()
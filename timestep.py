@@ -0,0 +1,51 @@
+from time import perf_counter
+
+# Fixed-timestep driver. Real elapsed time is poured into an accumulator and
+# the simulation is advanced in whole steps of 1/hz; whatever is left over
+# becomes `alpha`, the fraction of a step the renderer should interpolate by.
+
+SIM_HZ = 60
+MAX_CATCH_UP_STEPS = 5
+
+
+class FixedStepper:
+    def __init__(self, hz=SIM_HZ, max_steps=MAX_CATCH_UP_STEPS, max_speed=False,
+                 frame_budget=1 / 60):
+        self.dt = 1 / hz
+        self.max_steps = max_steps
+        self.max_speed = max_speed
+        self.frame_budget = frame_budget
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.dropped_steps = 0
+
+    def advance(self, elapsed, step):
+        # calls step(dt) as many times as fit and returns how many ran
+        if self.max_speed:
+            # offline runs: ignore the clock, fill the frame with steps
+            deadline = perf_counter() + self.frame_budget
+            steps = 0
+            while True:
+                step(self.dt)
+                steps += 1
+                if perf_counter() >= deadline:
+                    break
+            self.alpha = 1.0
+            return steps
+
+        self.accumulator += elapsed
+        steps = 0
+        # the small tolerance stops a 60 Hz display from landing a hair
+        # under one step and then doubling up on the next frame
+        while self.accumulator >= self.dt - 1e-9:
+            if steps == self.max_steps:
+                # too far behind; drop the backlog rather than spiral
+                self.dropped_steps += int(self.accumulator / self.dt)
+                self.accumulator = 0.0
+                break
+            step(self.dt)
+            self.accumulator -= self.dt
+            steps += 1
+        self.accumulator = max(self.accumulator, 0.0)
+        self.alpha = min(self.accumulator / self.dt, 1.0)
+        return steps
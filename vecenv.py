@@ -0,0 +1,300 @@
+import argparse
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from projectiles import OWNER_PLAYER
+from world import World, Inputs, SCREEN_WIDTH, SCREEN_HEIGHT, BASE_TICK_RATE
+
+# Vectorised environment for training agents: N independent worlds stepped
+# in lockstep at the fixed simulation rate. Actions come in and observations,
+# rewards and done flags go out through preallocated arrays, and the table of
+# enemies an observation is picked from is reused between steps. Picking
+# the nearest K still makes a few small temporaries per env and step (the
+# distances and the chosen rows), sized by what's on screen.
+#
+# Action row (float32):   move_x, move_y, aim angle in degrees, shoot
+#                         (move signs pick WASD; shoot > 0.5 fires)
+# Observation row (float32), positions relative to the player and scaled by
+# the screen size:
+#   player    x, y, cos(aim), sin(aim), health / 100
+#   boss      present, dx, dy, health fraction
+#   enemies   K x (dx, dy, is_shooter, health fraction), nearest first
+#   bullets   K x (dx, dy, vx, vy) for enemy and boss bullets, nearest first
+# Missing enemies/bullets are zero rows.
+#
+# With backend="process" the worlds are split across worker processes and all
+# of the arrays live in multiprocessing.shared_memory; a step just sends each
+# worker a one-word message and waits for its reply.
+
+ACTION_SIZE = 4
+PLAYER_OBS = 5
+BOSS_OBS = 4
+ENEMY_OBS = 4
+BULLET_OBS = 4
+NEAREST_K = 8
+MAX_EPISODE_TICKS = 60 * BASE_TICK_RATE
+SCORE_REWARD = 0.1      # per point of score
+HEALTH_REWARD = 0.01    # per point of health, lost or gained
+DEATH_REWARD = -1.0
+
+
+def obs_size(k=NEAREST_K):
+    return PLAYER_OBS + BOSS_OBS + k * (ENEMY_OBS + BULLET_OBS)
+
+
+class EnvSlice:
+    # steps a run of worlds, reading and writing rows of the shared arrays
+    def __init__(self, seeds, actions, obs, rewards, dones, k=NEAREST_K,
+                 max_ticks=MAX_EPISODE_TICKS):
+        self.seeds = list(seeds)
+        self.actions = actions
+        self.obs = obs
+        self.rewards = rewards
+        self.dones = dones
+        self.k = k
+        self.max_ticks = max_ticks
+        self.dt = 1 / BASE_TICK_RATE
+        self.episodes = [0] * len(self.seeds)
+        self.worlds = [None] * len(self.seeds)
+        self.ticks = [0] * len(self.seeds)
+        self.scale = np.array([SCREEN_WIDTH, SCREEN_HEIGHT], dtype=np.float32)
+        # observe()'s enemy table, grown to the most enemies seen
+        self.table = np.empty((0, ENEMY_OBS), dtype=np.float32)
+
+    def reset(self):
+        for i in range(len(self.worlds)):
+            self.reset_one(i)
+        self.rewards[:] = 0
+        self.dones[:] = False
+
+    def reset_one(self, i):
+        # every episode gets its own seed, derived from the env's seed
+        self.worlds[i] = World(seed=self.seeds[i] * 1000003 + self.episodes[i])
+        self.episodes[i] += 1
+        self.ticks[i] = 0
+        self.observe(i)
+
+    def step(self):
+        actions = self.actions
+        for i, world in enumerate(self.worlds):
+            move_x, move_y, angle, shoot = actions[i].tolist()
+            score = world.score
+            health = world.health
+            world.step(self.dt, Inputs(
+                up=move_y > 0, down=move_y < 0, left=move_x < 0, right=move_x > 0,
+                shoot=shoot > 0.5, angle=angle))
+            self.ticks[i] += 1
+
+            reward = (world.score - score) * SCORE_REWARD + \
+                (world.health - health) * HEALTH_REWARD
+            died = world.game_over or world.health <= 0
+            if died:
+                reward += DEATH_REWARD
+            self.rewards[i] = reward
+            done = died or self.ticks[i] >= self.max_ticks
+            self.dones[i] = done
+            # auto-reset, so obs[i] is already the first frame of the next game
+            if done:
+                self.reset_one(i)
+            else:
+                self.observe(i)
+
+    def observe(self, i):
+        world = self.worlds[i]
+        row = self.obs[i]
+        row[:] = 0
+        k = self.k
+        px = world.player_x
+        py = world.player_y
+        rad = np.radians(world.player_angle)
+        row[0] = px / SCREEN_WIDTH
+        row[1] = py / SCREEN_HEIGHT
+        row[2] = np.cos(rad)
+        row[3] = np.sin(rad)
+        row[4] = world.health / 100
+
+        boss = world.boss
+        if boss is not None:
+            row[5] = 1
+            row[6] = (boss.x - px) / SCREEN_WIDTH
+            row[7] = (boss.y - py) / SCREEN_HEIGHT
+            row[8] = boss.health / boss.max_health
+
+        start = PLAYER_OBS + BOSS_OBS
+        enemies = world.enemies.items
+        if enemies:
+            if len(enemies) > len(self.table):
+                self.table = np.empty((max(len(enemies), 2 * len(self.table)), ENEMY_OBS),
+                                      dtype=np.float32)
+            table = self.table[:len(enemies)]
+            table[:] = [(e.x, e.y, e.enemy_type == "shooter", e.health / e.max_health)
+                        for e in enemies]
+            order = self.nearest(table[:, 0] - px, table[:, 1] - py)
+            block = row[start:start + k * ENEMY_OBS].reshape(k, ENEMY_OBS)
+            picked = table[order]
+            block[:len(order), 0] = (picked[:, 0] - px) / SCREEN_WIDTH
+            block[:len(order), 1] = (picked[:, 1] - py) / SCREEN_HEIGHT
+            block[:len(order), 2:] = picked[:, 2:]
+
+        start += k * ENEMY_OBS
+        store = world.projectiles
+        n = store.count
+        hostile = np.flatnonzero(store.owner[:n] != OWNER_PLAYER)
+        if len(hostile):
+            dx = store.x[hostile] - px
+            dy = store.y[hostile] - py
+            order = self.nearest(dx, dy)
+            block = row[start:start + k * BULLET_OBS].reshape(k, BULLET_OBS)
+            block[:len(order), 0] = dx[order] / SCREEN_WIDTH
+            block[:len(order), 1] = dy[order] / SCREEN_HEIGHT
+            block[:len(order), 2] = store.vx[hostile[order]] / SCREEN_WIDTH
+            block[:len(order), 3] = store.vy[hostile[order]] / SCREEN_HEIGHT
+
+    def nearest(self, dx, dy):
+        # indices of the k closest, closest first
+        d2 = dx * dx + dy * dy
+        k = self.k
+        if len(d2) > k:
+            picked = np.argpartition(d2, k)[:k]
+            return picked[np.argsort(d2[picked])]
+        return np.argsort(d2)
+
+
+def worker(conn, names, shape, start, stop, seeds, k, max_ticks):
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        actions, obs, rewards, dones = shared_views(blocks, shape, k)
+        env = EnvSlice(seeds, actions[start:stop], obs[start:stop],
+                       rewards[start:stop], dones[start:stop], k, max_ticks)
+        while True:
+            command = conn.recv()
+            if command == "step":
+                env.step()
+            elif command == "reset":
+                env.reset()
+            elif command == "close":
+                break
+            conn.send(None)
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def shared_views(blocks, n, k):
+    return (
+        np.ndarray((n, ACTION_SIZE), np.float32, buffer=blocks[0].buf),
+        np.ndarray((n, obs_size(k)), np.float32, buffer=blocks[1].buf),
+        np.ndarray((n,), np.float32, buffer=blocks[2].buf),
+        np.ndarray((n,), np.bool_, buffer=blocks[3].buf),
+    )
+
+
+class VecEnv:
+    def __init__(self, num_envs, seed=0, k=NEAREST_K, max_ticks=MAX_EPISODE_TICKS,
+                 backend="serial", workers=None):
+        self.num_envs = num_envs
+        self.k = k
+        self.observation_size = obs_size(k)
+        self.action_size = ACTION_SIZE
+        self.backend = backend
+        self.blocks = []
+        self.workers = []
+        seeds = [seed * num_envs + i for i in range(num_envs)]
+
+        if backend == "serial":
+            self.actions = np.zeros((num_envs, ACTION_SIZE), np.float32)
+            self.obs = np.zeros((num_envs, self.observation_size), np.float32)
+            self.rewards = np.zeros(num_envs, np.float32)
+            self.dones = np.zeros(num_envs, np.bool_)
+            self.env = EnvSlice(seeds, self.actions, self.obs, self.rewards, self.dones,
+                                k, max_ticks)
+        elif backend == "process":
+            sizes = (num_envs * ACTION_SIZE * 4, num_envs * self.observation_size * 4,
+                     num_envs * 4, num_envs)
+            self.blocks = [shared_memory.SharedMemory(create=True, size=size)
+                           for size in sizes]
+            self.actions, self.obs, self.rewards, self.dones = \
+                shared_views(self.blocks, num_envs, k)
+            self.actions[:] = 0
+            workers = min(workers or mp.cpu_count(), num_envs)
+            bounds = np.linspace(0, num_envs, workers + 1).astype(int).tolist()
+            names = [block.name for block in self.blocks]
+            for start, stop in zip(bounds, bounds[1:]):
+                parent, child = mp.Pipe()
+                process = mp.Process(target=worker, daemon=True, args=(
+                    child, names, num_envs, start, stop, seeds[start:stop], k, max_ticks))
+                process.start()
+                self.workers.append((process, parent))
+        else:
+            raise ValueError(f"unknown backend {backend!r}")
+
+    def broadcast(self, command):
+        for process, conn in self.workers:
+            conn.send(command)
+        for process, conn in self.workers:
+            conn.recv()
+
+    def reset(self):
+        if self.workers:
+            self.broadcast("reset")
+        else:
+            self.env.reset()
+        return self.obs
+
+    def step(self, actions=None):
+        # the returned arrays are reused by the next step; copy to keep them
+        if actions is not None:
+            self.actions[:] = actions
+        if self.workers:
+            self.broadcast("step")
+        else:
+            self.env.step()
+        return self.obs, self.rewards, self.dones
+
+    def close(self):
+        for process, conn in self.workers:
+            conn.send("close")
+            process.join()
+        self.workers = []
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time vectorised env steps with random "
+                                                 "actions")
+    parser.add_argument("backend", nargs="?", choices=["serial", "process"],
+                        default="serial")
+    parser.add_argument("num_envs", nargs="?", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--workers", type=int, help="processes for the process backend "
+                                                    "(default one per CPU)")
+    args = parser.parse_args()
+
+    num_envs = args.num_envs
+    rng = np.random.default_rng(0)
+    with VecEnv(num_envs, backend=args.backend, workers=args.workers) as env:
+        env.reset()
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            actions = np.column_stack([
+                rng.integers(-1, 2, num_envs), rng.integers(-1, 2, num_envs),
+                rng.uniform(0, 360, num_envs), rng.random(num_envs)])
+            env.step(actions)
+        elapsed = time.perf_counter() - start
+    print(f"{args.backend}: {num_envs * args.steps / elapsed:.0f} env steps/s")
+
+
+if __name__ == "__main__":
+    main()
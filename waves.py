@@ -0,0 +1,155 @@
+import bisect
+import json
+import tomllib
+
+import numpy as np
+
+from world import (
+    ENEMY_TYPES, SPAWN_SIDES, ENEMY_SPEED_MIN, ENEMY_SPEED_MAX, edge_positions,
+)
+
+# Data-driven enemy waves. A timeline file (JSON or TOML) lists waves:
+#
+#   {"at": 5, "count": 12, "types": {"normal": 3, "shooter": 1},
+#    "sides": ["top", "left"], "every": 2, "repeat": 10}
+#   {"at": 60, "boss": true}
+#   {"score": 210, "boss": true}
+#
+# "types" are relative weights over ENEMY_TYPES (default: all equal), "sides"
+# are the Enemy spawn sides to pick from (default: all four), and every/repeat
+# fire the same wave again every `every` seconds, `repeat` times in total.
+# A boss wave fires at a time ("at") or once the score reaches "score".
+#
+# load_timeline() compiles the file once into flat arrays sorted by time. Each
+# tick, WaveScheduler.advance() takes everything that came due, draws types,
+# sides and speeds for the whole batch in one go and hands the arrays to
+# World.spawn_batch().
+
+WAVE_KEYS = {"at", "count", "types", "sides", "every", "repeat", "boss", "score"}
+
+
+class Timeline:
+    def __init__(self, times, counts, type_weights, side_weights, boss_times, boss_scores):
+        self.times = times                  # (n,) seconds, sorted
+        self.counts = counts                # (n,) enemies per event
+        self.type_weights = type_weights    # (n, len(ENEMY_TYPES)) cumulative
+        self.side_weights = side_weights    # (n, len(SPAWN_SIDES)) cumulative
+        self.boss_times = boss_times        # sorted seconds
+        self.boss_scores = boss_scores      # sorted scores
+
+
+def cumulative(weights, names, what):
+    # {"name": weight} -> cumulative probabilities in `names` order
+    if weights is None:
+        weights = dict.fromkeys(names, 1)
+    elif isinstance(weights, list):
+        weights = dict.fromkeys(weights, 1)
+    unknown = set(weights) - set(names)
+    if unknown:
+        raise ValueError(f"unknown {what} {sorted(unknown)}; expected {names}")
+    row = np.array([weights.get(name, 0) for name in names], dtype=float)
+    if row.sum() <= 0:
+        raise ValueError(f"{what} weights must add up to more than zero")
+    return np.cumsum(row) / row.sum()
+
+
+def compile_timeline(spec):
+    waves = spec["waves"] if isinstance(spec, dict) else spec
+    events = []
+    boss_times = []
+    boss_scores = []
+    for index, wave in enumerate(waves):
+        unknown = set(wave) - WAVE_KEYS
+        if unknown:
+            raise ValueError(f"wave {index}: unknown keys {sorted(unknown)}")
+        if wave.get("boss"):
+            if "score" in wave:
+                boss_scores.append(wave["score"])
+            else:
+                boss_times.append(float(wave.get("at", 0)))
+            continue
+
+        types = cumulative(wave.get("types"), ENEMY_TYPES, "enemy types")
+        sides = cumulative(wave.get("sides"), SPAWN_SIDES, "sides")
+        start = float(wave.get("at", 0))
+        every = float(wave.get("every", 0))
+        for i in range(int(wave.get("repeat", 1))):
+            events.append((start + i * every, index, int(wave.get("count", 1)), types, sides))
+
+    # ties keep file order
+    events.sort(key=lambda event: (event[0], event[1]))
+    return Timeline(
+        np.array([e[0] for e in events]),
+        np.array([e[2] for e in events], dtype=np.intp),
+        np.array([e[3] for e in events]).reshape(len(events), len(ENEMY_TYPES)),
+        np.array([e[4] for e in events]).reshape(len(events), len(SPAWN_SIDES)),
+        sorted(boss_times),
+        sorted(boss_scores),
+    )
+
+
+def load_timeline(path):
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path) as f:
+            spec = json.load(f)
+    return compile_timeline(spec)
+
+
+class WaveScheduler:
+    # plays a Timeline into one World; the timeline itself is never changed,
+    # so many worlds can share one
+    def __init__(self, timeline, seed=0):
+        self.timeline = timeline
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        self.time = 0.0
+        self.next_event = 0
+        self.next_boss_time = 0
+        self.next_boss_score = 0
+        self.rng = np.random.default_rng((self.seed, 2))
+
+    def finished(self):
+        timeline = self.timeline
+        return (self.next_event == len(timeline.times) and
+                self.next_boss_time == len(timeline.boss_times) and
+                self.next_boss_score == len(timeline.boss_scores))
+
+    def advance(self, world, delta_time):
+        self.time += delta_time
+        timeline = self.timeline
+
+        due = bisect.bisect_right(timeline.times, self.time, self.next_event)
+        if due > self.next_event:
+            self.spawn(world, self.next_event, due)
+            self.next_event = due
+
+        boss_due = bisect.bisect_right(timeline.boss_times, self.time, self.next_boss_time)
+        score_due = bisect.bisect_right(timeline.boss_scores, world.score, self.next_boss_score)
+        if boss_due > self.next_boss_time or score_due > self.next_boss_score:
+            self.next_boss_time = boss_due
+            self.next_boss_score = score_due
+            world.spawn_boss()
+
+    def spawn(self, world, first, last):
+        # one set of draws for every enemy in every event that came due
+        timeline = self.timeline
+        counts = timeline.counts[first:last]
+        event = np.repeat(np.arange(first, last), counts)
+        total = len(event)
+        if total == 0:
+            return
+        rng = self.rng
+        u = rng.random((3, total))
+        types = (u[0][:, None] > timeline.type_weights[event]).sum(axis=1)
+        sides = (u[1][:, None] > timeline.side_weights[event]).sum(axis=1)
+        # guard against the last cumulative weight rounding below 1
+        np.minimum(types, len(ENEMY_TYPES) - 1, out=types)
+        np.minimum(sides, len(SPAWN_SIDES) - 1, out=sides)
+        speed = ENEMY_SPEED_MIN + u[2] * (ENEMY_SPEED_MAX - ENEMY_SPEED_MIN)
+        x, y = edge_positions(rng, sides, world.width, world.height)
+        world.spawn_batch(x, y, types, speed)
@@ -0,0 +1,531 @@
+import arcade
+import math
+from time import perf_counter
+
+from projectiles import OWNER_ENEMY, OWNER_BOSS
+from governor import FrameGovernor
+from profiler import FrameProfiler
+from renderer import BatchRenderer, SHIELD_COLOR, SHIELD_SCALE
+from renderframe import camera_view, pack_frame
+from replay import InputRecorder, state_hash
+from simthread import SimThread
+from snapshot import SnapshotRing, capture, restore, save, load
+from swarm import GAME_MODES
+from telemetry import start_telemetry
+from textcache import TextCache, Hud
+from timestep import FixedStepper, SIM_HZ, MAX_CATCH_UP_STEPS
+from waves import WaveScheduler, load_timeline
+from world import SCREEN_WIDTH, SCREEN_HEIGHT, Inputs
+
+SCREEN_TITLE = "space shooter"
+QUICKSAVE_PATH = "quicksave.snap"
+# ticks between rewind snapshots; a swarm snapshot is ~100 KB that barely
+# compresses, so swarm mode keeps fewer of them and rewinds in bigger steps
+REWIND_EVERY = {"classic": 1, "swarm": 6}
+
+# "batched" draws everything through renderer.BatchRenderer in a few calls,
+# "immediate" keeps the original one-draw-call-per-shape path for comparison
+RENDER_MODE = "batched"
+
+
+# Drawing lives here so that world.py stays free of arcade. Nothing imports
+# this module until a window is actually wanted (see the game script).
+
+def draw_powerup(powerup):
+    arcade.draw_circle_filled(powerup.x, powerup.y, powerup.radius, powerup.color)
+    if powerup.type == "rapid_fire":
+        arcade.draw_text("⚡", powerup.x - 6, powerup.y - 6, arcade.color.WHITE, 12)
+    elif powerup.type == "shield":
+        arcade.draw_text("❤️", powerup.x - 6, powerup.y - 6, arcade.color.WHITE, 12)
+    else:
+        arcade.draw_text("💛", powerup.x - 6, powerup.y - 6, arcade.color.WHITE, 12)
+
+
+def draw_particles(pool):
+    for i in pool.alive().tolist():
+        r, g, b = pool.color[i]
+        color_with_alpha = (int(r), int(g), int(b), int(pool.alpha[i]))
+
+        arcade.draw_circle_filled(
+            center_x=float(pool.x[i]),
+            center_y=float(pool.y[i]),
+            radius=float(pool.size[i]),
+            color=color_with_alpha
+        )
+
+
+def draw_enemy_bullet(enemybullet):
+    arcade.draw_circle_filled(
+        enemybullet.x, enemybullet.y, enemybullet.radius, arcade.color.YELLOW
+    )
+
+
+def draw_enemy(enemy):
+    if enemy.enemy_type == "shooter":
+        color = arcade.color.RED
+    else:
+        color = arcade.color.BLUE
+
+    arcade.draw_triangle_filled(
+        enemy.x + math.cos(math.radians(enemy.angle)) * enemy.radius * 2,
+        enemy.y + math.sin(math.radians(enemy.angle)) * enemy.radius * 2,
+        enemy.x + math.cos(math.radians(enemy.angle + 140)) * enemy.radius,
+        enemy.y + math.sin(math.radians(enemy.angle + 140)) * enemy.radius,
+        enemy.x + math.cos(math.radians(enemy.angle - 140)) * enemy.radius,
+        enemy.y + math.sin(math.radians(enemy.angle - 140)) * enemy.radius,
+        color
+    )
+
+
+def draw_enemy_health_bar(enemy):
+    if enemy.health < enemy.max_health:
+        bar_width = 40
+        bar_height = 5
+        health_percentage = enemy.health / enemy.max_health
+        health_width = health_percentage * bar_width
+
+        bar_x = enemy.x
+        bar_y = enemy.y + enemy.radius + 30
+
+        arcade.draw_rect_filled(
+            arcade.XYWH(bar_x, bar_y, bar_width, bar_height), arcade.color.RED
+        )
+        arcade.draw_rect_filled(
+            arcade.XYWH(bar_x - (bar_width - health_width) / 2, bar_y,
+                                     health_width, bar_height), arcade.color.GREEN)
+        arcade.draw_rect_outline(
+            arcade.XYWH(bar_x, bar_y, bar_width, bar_height), arcade.color.WHITE,
+            border_width=1
+        )
+
+
+def draw_boss_bullet(bossbullet):
+    # big boss bullets are the yellow ones
+    if bossbullet.radius > 6:
+        color = arcade.color.YELLOW
+    else:
+        color = arcade.color.ORANGE_RED
+    arcade.draw_circle_filled(bossbullet.x, bossbullet.y, bossbullet.radius, color)
+
+
+def draw_boss(boss):
+    if boss.flashing:
+        draw_color = arcade.color.WHITE
+    else:
+        draw_color = boss.color
+
+    points = [
+        (boss.x + math.cos(math.radians(boss.angle)) * boss.radius * 1.5,
+         boss.y + math.sin(math.radians(boss.angle)) * boss.radius * 1.5),
+        (boss.x + math.cos(math.radians(boss.angle + 90)) * boss.radius,
+         boss.y + math.sin(math.radians(boss.angle + 90)) * boss.radius),
+        (boss.x + math.cos(math.radians(boss.angle + 180)) * boss.radius * 1.5,
+         boss.y + math.sin(math.radians(boss.angle + 180)) * boss.radius * 1.5),
+        (boss.x + math.cos(math.radians(boss.angle + 270)) * boss.radius,
+         boss.y + math.sin(math.radians(boss.angle + 270)) * boss.radius)
+    ]
+    arcade.draw_polygon_filled(points, draw_color)
+
+
+def draw_boss_health_bar(boss):
+    bar_width = 200
+    bar_height = 15
+    health_percentage = boss.health / boss.max_health
+    health_width = health_percentage * bar_width
+
+    bar_x = boss.x
+    bar_y = boss.y + boss.radius + 40
+
+    arcade.draw_rect_filled(
+        arcade.XYWH(bar_x, bar_y, bar_width, bar_height), arcade.color.RED)
+
+    if health_percentage > 0.7:
+        health_color = arcade.color.GREEN
+    elif health_percentage > 0.4:
+        health_color = arcade.color.YELLOW
+    else:
+        health_color = arcade.color.RED
+
+    arcade.draw_rect_filled(
+        arcade.XYWH(bar_x - (bar_width - health_width) / 2, bar_y, health_width, bar_height), health_color
+    )
+
+    arcade.draw_rect_outline(
+        arcade.XYWH(bar_x, bar_y, bar_width, bar_height), arcade.color.WHITE, 2
+    )
+
+    arcade.draw_text(f"BOSS HP: {boss.health}/{boss.max_health}",
+                    bar_x - 80, bar_y + 25, arcade.color.WHITE, 12)
+
+
+def draw_bullet(bullet):
+    arcade.draw_circle_filled(
+        bullet.x, bullet.y, bullet.radius, arcade.color.YELLOW)
+
+
+# enemy_bullets holds both enemy and boss bullets
+ENEMY_BULLET_DRAWERS = {
+    OWNER_ENEMY: draw_enemy_bullet,
+    OWNER_BOSS: draw_boss_bullet,
+}
+
+
+class GameWindow(arcade.Window):
+    def __init__(self, render_mode=RENDER_MODE, seed=None, record_path=None, replay=None,
+                 profile_path=None, tick_rate=SIM_HZ, max_speed=False, mode="classic",
+                 waves_path=None, world_size=None, startup=None, threaded=False,
+                 telemetry_dir=None, telemetry_format="jsonl", quality=None):
+        super().__init__(SCREEN_WIDTH,SCREEN_HEIGHT,SCREEN_TITLE)
+        arcade.set_background_color(arcade.color.BLACK)
+
+        self.render_mode = render_mode
+        self.text_cache = TextCache()
+        self.hud = Hud()
+        self.batch_renderer = BatchRenderer(self.ctx, self.text_cache)
+
+        # F3 toggles the profiler and its overlay; --profile turns it on from
+        # the start and dumps the numbers when the window closes
+        self.profiler = FrameProfiler(enabled=profile_path is not None)
+        self.profile_path = profile_path
+        self.show_profile = False
+        self.profile_text = arcade.Text("", 10, SCREEN_HEIGHT - 10, arcade.color.WHITE, 10,
+                                        font_name="monospace", multiline=True, width=400,
+                                        anchor_y="top")
+        self.profile_refresh = 0
+
+        # drops cosmetic detail when frames run over budget (see governor.py);
+        # quality pins a level instead. A max-speed run fills every frame with
+        # ticks on purpose, so only its drawing counts against the budget.
+        self.governor = FrameGovernor(fixed=quality)
+        self.update_cost = 0.0
+        self.count_update = not max_speed
+
+        if replay is not None:
+            seed = replay.seed
+            mode = replay.mode
+            world_size = replay.world_size
+        kwargs = {}
+        if world_size:
+            kwargs["width"], kwargs["height"] = world_size
+        self.world = GAME_MODES[mode](seed=seed, profiler=self.profiler, **kwargs)
+        # the world is drawn through a camera that follows the ship; the HUD
+        # and overlays stay on the window's default camera
+        self.camera = arcade.camera.Camera2D()
+        if waves_path:
+            self.world.waves = WaveScheduler(load_timeline(waves_path), self.world.seed)
+        # gameplay events go to a background writer (see telemetry.py)
+        self.telemetry = None
+        if telemetry_dir:
+            self.telemetry = start_telemetry(self.world, telemetry_dir, telemetry_format,
+                                             {"tick_rate": tick_rate})
+        # the sim advances in fixed steps whatever the display rate is
+        self.stepper = FixedStepper(tick_rate, MAX_CATCH_UP_STEPS, max_speed)
+        if max_speed:
+            self.set_update_rate(1 / 1000)
+        self.keys_pressed = set()
+        self.aim_angle = 0
+        # clicks counted here and consumed by read_inputs, so a click can't
+        # be lost when the two run on different threads
+        self.mouse_shots = 0
+        self.mouse_shots_read = 0
+
+        # a StartupTimer when --startup-report is on; reported after the first tick
+        self.startup = startup
+
+        self.recorder = None
+        if record_path:
+            self.recorder = InputRecorder(record_path, self.world.seed, mode,
+                                          self.world.width, self.world.height)
+
+        # holding Backspace steps back through the last few seconds; F5/F9
+        # quicksave and quickload. Both rewrite history, so neither is
+        # available while recording or replaying inputs.
+        self.snapshots = None
+        if record_path is None and replay is None:
+            self.snapshots = SnapshotRing()
+        self.tick = 0
+        self.rewind_every = REWIND_EVERY[self.world.mode]
+
+        # replays ignore the keyboard and run as fast as the machine allows
+        self.replay_ticks = None
+        if replay is not None:
+            self.replay_ticks = iter(replay)
+            self.replay_hash = replay.final_hash
+            self.set_update_rate(1 / 1000)
+            self.set_draw_rate(1 / 1000)
+
+        # threaded: fixed_step runs on a SimThread and on_draw draws the
+        # frames it packs (see simthread.py)
+        self.sim = None
+        if threaded:
+            if replay is not None:
+                raise ValueError("replays can't run on a sim thread")
+            if render_mode != "batched":
+                raise ValueError("a sim thread needs the batched renderer")
+            self.sim = SimThread(self.fixed_step, self.pack, tick_rate, MAX_CATCH_UP_STEPS,
+                                 max_speed, self.profiler)
+            self.sim.start()
+
+    def on_draw(self):
+        started = perf_counter()
+        t = self.profiler.mark()
+        self.profiler.interval("frame gap")
+        self.clear()
+        if self.sim is not None:
+            # the world belongs to the sim thread; only its latest frame is read
+            frame = shown = self.sim.frame
+            alpha = self.sim.alpha(frame)
+        else:
+            frame = None
+            shown = self.world
+            alpha = self.stepper.alpha
+        if shown.game_over:
+            self.text_cache.draw("GAME OVER - Press 'R' to Restart", SCREEN_WIDTH/2, SCREEN_HEIGHT/2, arcade.color.RED, 30, anchor_x="center")
+            return
+
+        view = self.follow_player(shown, alpha)
+        self.camera.use()
+        if self.render_mode == "batched":
+            if frame is None:
+                frame = pack_frame(self.world, view)
+            self.batch_renderer.draw_frame(frame, alpha, self.governor.quality)
+            drawn = len(frame)
+        else:
+            self.draw_immediate(self.world)
+            drawn = len(self.world.enemies) + self.world.projectiles.count
+        self.default_camera.use()
+
+        self.hud.draw(shown.score, shown.health)
+        self.profiler.lap("draw", t, drawn)
+        self.governor.record(perf_counter() - started + self.update_cost)
+        self.update_cost = 0.0
+
+        if self.show_profile:
+            self.draw_profile()
+
+    def shown(self):
+        # where the window reads the player from: the world, or the frame
+        # the sim thread last packed
+        return self.sim.frame if self.sim is not None else self.world
+
+    def pack(self, tick):
+        # on the sim thread: a frame culled to where the camera will be
+        world = self.world
+        view = camera_view(world.width, world.height, world.player_x, world.player_y)
+        return pack_frame(world, view, tick)
+
+    def follow_player(self, shown, alpha):
+        # centres the camera on the ship, stopping at the world's edges, and
+        # returns the world rectangle it shows
+        x = shown.prev_player_x + (shown.player_x - shown.prev_player_x) * alpha
+        y = shown.prev_player_y + (shown.player_y - shown.prev_player_y) * alpha
+        view = camera_view(shown.width, shown.height, x, y)
+        left, bottom, right, top = view
+        self.camera.position = ((left + right) / 2, (bottom + top) / 2)
+        return view
+
+    def draw_profile(self):
+        self.profile_refresh -= 1
+        if self.profile_refresh <= 0:
+            self.profile_refresh = 30
+            self.profile_text.text = "\n".join(self.profiler.overlay_lines() +
+                                               self.governor.overlay_lines())
+        self.profile_text.draw()
+
+    def draw_immediate(self, world):
+        if world.boss:
+            draw_boss(world.boss)
+            draw_boss_health_bar(world.boss)
+
+        for enemy in world.enemies:
+            draw_enemy(enemy)
+            draw_enemy_health_bar(enemy)
+        if world.swarm is not None:
+            for enemy in world.swarm.views():
+                draw_enemy(enemy)
+                draw_enemy_health_bar(enemy)
+
+        arcade.draw_triangle_filled(
+           world.player_x +
+           math.cos(math.radians(world.player_angle)) *
+           world.player_radius * 1.5,
+           world.player_y +
+           math.sin(math.radians(world.player_angle)) *
+           world.player_radius * 1.5,
+           world.player_x +
+           math.cos(math.radians(world.player_angle + 150)) *
+           world.player_radius,
+           world.player_y +
+           math.sin(math.radians(world.player_angle + 150)) *
+           world.player_radius,
+           world.player_x +
+           math.cos(math.radians(world.player_angle - 150)) *
+           world.player_radius,
+           world.player_y +
+           math.sin(math.radians(world.player_angle - 150)) *
+           world.player_radius,
+           arcade.color.WHITE
+        )
+        if "shield" in world.effects:
+            arcade.draw_circle_filled(world.player_x, world.player_y,
+                                      world.player_radius * SHIELD_SCALE, SHIELD_COLOR)
+
+        for bullet in world.bullets:
+            draw_bullet(bullet)
+        for enemybullet in world.enemy_bullets:
+            ENEMY_BULLET_DRAWERS[enemybullet.owner](enemybullet)
+
+        for powerup in world.powerups:
+            draw_powerup(powerup)
+
+        draw_particles(world.particles)
+
+    def read_inputs(self):
+        shots = self.mouse_shots
+        clicked = shots != self.mouse_shots_read
+        self.mouse_shots_read = shots
+        inputs = Inputs(
+            up=arcade.key.W in self.keys_pressed,
+            down=arcade.key.S in self.keys_pressed,
+            left=arcade.key.A in self.keys_pressed,
+            right=arcade.key.D in self.keys_pressed,
+            shoot=arcade.key.SPACE in self.keys_pressed or clicked,
+            angle=self.aim_angle,
+        )
+        return inputs
+
+    def on_update(self, delta_time):
+        started = perf_counter()
+        self.advance_sim(delta_time)
+        if self.count_update:
+            self.update_cost += perf_counter() - started
+
+    def advance_sim(self, delta_time):
+        if self.sim is not None:
+            self.sim.check()
+            return
+        if self.replay_ticks is not None:
+            self.replay_step()
+            return
+
+        self.stepper.advance(delta_time, self.fixed_step)
+
+    def fixed_step(self, dt):
+        self.profiler.interval("tick gap")
+        snapshots = self.snapshots
+        if snapshots is not None and arcade.key.BACKSPACE in self.keys_pressed:
+            rewound = snapshots.rewind()
+            if rewound is not None:
+                self.tick, data = rewound
+                restore(self.world, data)
+            return
+
+        inputs = self.read_inputs()
+        if self.recorder:
+            self.recorder.record(dt, inputs)
+        self.world.step(dt, inputs)
+        self.tick += 1
+        if snapshots is not None and self.tick % self.rewind_every == 0:
+            snapshots.push(self.tick, capture(self.world))
+        if self.startup:
+            self.report_startup()
+
+    def report_startup(self):
+        self.startup.mark("first tick")
+        print("\n".join(self.startup.lines()))
+        self.startup = None
+
+    def replay_step(self):
+        tick = next(self.replay_ticks, None)
+        if tick is None:
+            if self.replay_hash is not None:
+                ok = state_hash(self.world) == self.replay_hash
+                print(f"replay finished: score {self.world.score} "
+                      f"hash {'ok' if ok else 'MISMATCH'}")
+                self.replay_hash = None
+                self.close()
+            return
+        restart, delta_time, inputs = tick
+        if restart:
+            self.world.restart()
+        self.world.step(delta_time, inputs)
+        if self.startup:
+            self.report_startup()
+
+    def on_close(self):
+        if self.sim is not None:
+            self.sim.stop()
+        if self.profile_path:
+            self.profiler.dump(self.profile_path)
+            self.profile_path = None
+            for line in self.governor.log_lines():
+                print(f"quality: {line}")
+        if self.recorder:
+            self.recorder.close(self.world)
+            self.recorder = None
+        if self.telemetry:
+            self.telemetry.close()
+            print(self.telemetry.summary())
+            self.telemetry = None
+        super().on_close()
+
+    def on_key_press(self, symbol, modifiers):
+        self.keys_pressed.add(symbol)
+
+        if symbol == arcade.key.R:
+            self.on_sim(self.restart_if_over)
+
+        if symbol == arcade.key.F3:
+            self.show_profile = not self.show_profile
+            self.profiler.enabled = self.show_profile or self.profile_path is not None
+
+        if self.snapshots is not None:
+            if symbol == arcade.key.F5:
+                self.on_sim(self.quicksave)
+            elif symbol == arcade.key.F9:
+                self.on_sim(self.quickload)
+
+    def on_sim(self, fn):
+        # anything that touches the world runs where the world is stepped
+        if self.sim is not None:
+            self.sim.call(fn)
+        else:
+            fn()
+
+    def quicksave(self):
+        save(QUICKSAVE_PATH, capture(self.world))
+
+    def quickload(self):
+        try:
+            restore(self.world, load(QUICKSAVE_PATH))
+        except (OSError, ValueError) as error:
+            print(f"quickload failed: {error}")
+        else:
+            self.snapshots.clear()
+
+    def on_key_release(self, symbol, modifiers):
+        if symbol in self.keys_pressed:
+            self.keys_pressed.remove(symbol)
+
+    def on_mouse_motion(self, x, y, dx, dy):
+        x, y, _ = self.camera.unproject((x, y))
+        shown = self.shown()
+        dx = x - shown.player_x
+        dy = y - shown.player_y
+        self.aim_angle = math.degrees(math.atan2(dy,dx))
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        if button == arcade.MOUSE_BUTTON_LEFT:
+         self.mouse_shots += 1
+
+    def restart_if_over(self):
+        if self.world.game_over:
+            self.restart_game()
+
+    def restart_game(self):
+        self.aim_angle = 0
+        if self.recorder:
+            self.recorder.restart()
+        self.world.restart()
+        if self.snapshots is not None:
+            self.snapshots.clear()
@@ -0,0 +1,866 @@
+import math
+import random
+
+import numpy as np
+
+from particles import ParticlePool
+from patterns import PHASES
+from profiler import FrameProfiler
+from projectiles import ProjectileStore, OWNER_PLAYER, OWNER_ENEMY
+from registry import Registry
+from scheduler import Scheduler
+from spatial import SpatialHash
+from sweep import contact_time
+
+# Pure-python game state and rules. Nothing in here touches arcade, so the
+# simulation can run headless (soak tests, balancing) as fast as the CPU allows.
+
+SCREEN_WIDTH = 900
+SCREEN_HEIGHT = 600
+
+# speeds below are in pixels per 1/60 s; every update scales them by
+# delta_time * BASE_TICK_RATE so gameplay is independent of the step rate
+BASE_TICK_RATE = 60
+
+PLAYER_SCALE = 0.3
+PLAYER_SPEED = 5
+PLAYER_TURN_SPEED = 3
+PLAYER_SHOOT_COOLDOWN = 0.2
+
+
+BULLET_SPEED = 10
+BULLET_SCALE = 0.8
+BULLET_RADIUS = 5 * BULLET_SCALE
+
+ENEMY_SPAWN_RATE = 1
+ENEMY_SPEED_MAX = 3
+ENEMY_SPEED_MIN = 3
+ENEMY_SCALE = 0.3
+ENEMY_RADIUS = 40 * ENEMY_SCALE
+
+ENEMY_TYPES = ["normal", "shooter"]
+ENEMY_SHOOT_COOLDOWN = 2.0
+ENEMY_BULLET_SPEED = 5
+
+POWERUP_RADIUS = 20
+POWERUP_DROP_CHANCE = 0.2
+POWERUP_TYPES = ["rapid_fire", "shield", "health"]
+RAPID_FIRE_DURATION = 5.0
+SHIELD_DURATION = 5.0
+# timed powerups; World.effects maps the active ones to when they run out
+EFFECTS = ["rapid_fire", "shield"]
+
+BOSS_SCORE = 210
+BOSS_FLASH_TIME = 0.3
+
+PARTICLE_COUNT = 5
+PARTICLE_KILL_COUNT = 30
+PARTICLE_BOSS_KILL_COUNT = 400
+PARTICLE_SPEED = 3
+PARTICLE_FADE_RATE = 8
+
+# same values as arcade.color, kept here so the rules don't need arcade
+WHITE = (255, 255, 255, 255)
+RED = (255, 0, 0, 255)
+GREEN = (0, 255, 0, 255)
+BLUE = (0, 0, 255, 255)
+CYAN = (0, 255, 255, 255)
+YELLOW = (255, 255, 0, 255)
+ORANGE = (255, 165, 0, 255)
+ORANGE_RED = (255, 69, 0, 255)
+
+ENEMY_BULLET_COLOR = RED
+
+# World.timers event kinds, in the order events due at the same moment run
+TIMED_SPAWN, ENEMY_SHOT, BOSS_VOLLEY, BOSS_FLASH, EFFECT_END = range(5)
+
+# World.events kinds: gameplay telemetry, published as (kind, time, x, y,
+# amount, detail) - see telemetry.py for what amount and detail hold
+(EVENT_KILL, EVENT_DAMAGE, EVENT_POWERUP, EVENT_BOSS_SPAWN, EVENT_BOSS_KILL, EVENT_SCORE,
+ EVENT_RESTART) = range(7)
+
+# "grid" uses the spatial hash, "brute" keeps the original all-pairs loops
+# around for cross-checking. Both must produce the same hits.
+BROADPHASE = "grid"
+BROADPHASE_CELL_SIZE = 2 * max(ENEMY_RADIUS, BULLET_RADIUS, POWERUP_RADIUS)
+
+# The world can be bigger than the window (World(width=, height=)); the
+# window's camera follows the player. Enemies more than a screen away from
+# the player in either direction are "asleep": they bank the time that
+# passes and catch up in one bigger step every SLEEP_STEP seconds. Awake
+# enemies are filed in view_index, which the renderer queries for what is
+# on screen. In a screen-sized world nothing is ever that far away, so
+# nothing sleeps.
+AWAKE_WIDTH = SCREEN_WIDTH + 100
+AWAKE_HEIGHT = SCREEN_HEIGHT + 100
+SLEEP_STEP = 0.1
+VIEW_CELL_SIZE = 128
+
+
+class PowerUp:
+    def __init__(self, x, y, power_type):
+        self.x = x
+        self.y = y
+        self.type = power_type
+        self.radius = POWERUP_RADIUS
+        self.speed_y = -1
+
+        if power_type == "rapid_fire":
+            self.color = CYAN
+        elif power_type == "shield":
+            self.color = BLUE
+        else:
+            self.color = GREEN
+
+        self.prev_x = x
+        self.prev_y = y
+
+    def update(self, delta_time=1 / BASE_TICK_RATE):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.y += self.speed_y * delta_time * BASE_TICK_RATE
+
+
+# Bullet and EnemyBullet describe a shot; World.add_projectile copies them
+# into its ProjectileStore, which is what actually simulates them. The boss
+# writes its volleys into the store directly (see patterns.py).
+
+class EnemyBullet:
+    owner = OWNER_ENEMY
+
+    def __init__(self, x, y, angle):
+        self.x = x
+        self.y = y
+        self.angle = angle
+        self.speed = ENEMY_BULLET_SPEED
+        self.radius = 6
+        self.damage = 10
+        self.color = ENEMY_BULLET_COLOR
+        self.dx = math.cos(math.radians(angle)) * self.speed
+        self.dy = math.sin(math.radians(angle)) * self.speed
+
+
+SPAWN_SIDES = ["top", "right", "bottom", "left"]
+
+
+def edge_positions(rng, side, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+    # Enemy.__init__'s spawn points for a whole batch: side holds indices
+    # into SPAWN_SIDES, rng is a numpy Generator
+    along = rng.random(len(side))
+    x = np.where(side == 0, along * width,
+                 np.where(side == 1, width + 20,
+                          np.where(side == 2, along * width, -20.0)))
+    y = np.where(side == 0, height + 20,
+                 np.where(side == 1, along * height,
+                          np.where(side == 2, -20.0, along * height)))
+    return x, y
+
+
+class Enemy:
+    # anything passed in is used as is; the rest is drawn from rng
+    def __init__(self, rng=random, x=None, y=None, enemy_type=None, speed=None,
+                 width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        if x is not None:
+            side = None
+            self.x = x
+            self.y = y
+        else:
+            side = rng.choice(SPAWN_SIDES)
+        if side == "top":
+            self.x = rng.uniform(0, width)
+            self.y = height + 20
+        elif side == "right":
+            self.x = width + 20
+            self.y = rng.uniform(0, height)
+        elif side == "bottom":
+            self.x = rng.uniform(0, width)
+            self.y = -20
+        elif side == "left":
+            self.x = -20
+            self.y = rng.uniform(0, height)
+
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+        self.enemy_type = enemy_type if enemy_type is not None else rng.choice(ENEMY_TYPES)
+        self.speed = speed if speed is not None else rng.uniform(ENEMY_SPEED_MIN, ENEMY_SPEED_MAX)
+        self.angle = 0
+        self.radius = ENEMY_RADIUS
+        self.health = 3
+        self.max_health = 3
+        self.shoot_at = 0.0    # sim time of the next shot, for shooters
+        self.lag = 0.0    # time banked while asleep
+
+    def take_damage(self):
+        self.health -= 1
+        return self.health <= 0
+
+    def update(self, player_x, player_y, delta_time):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        dx = player_x - self.x
+        dy = player_y - self.y
+        self.angle = math.degrees(math.atan2(dy, dx))
+
+        step = self.speed * delta_time * BASE_TICK_RATE
+        self.x += math.cos(math.radians(self.angle)) * step
+        self.y += math.sin(math.radians(self.angle)) * step
+
+    def shoot(self):
+        bullet_x = self.x + \
+            math.cos(math.radians(self.angle)) * self.radius
+        bullet_y = self.y + \
+            math.sin(math.radians(self.angle)) * self.radius
+        return EnemyBullet(bullet_x, bullet_y, self.angle)
+
+    def is_off_screen(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        return (self.x < -50 or self.x > width + 50 or
+                self.y < -50 or self.y > height + 50)
+
+
+class Boss:
+    # fires the patterns of the phase its health puts it in (patterns.py);
+    # `now` is the sim time it appears at
+    def __init__(self, rng=random, x=None, width=SCREEN_WIDTH, height=SCREEN_HEIGHT,
+                 phases=PHASES, now=0.0):
+        self.x = x if x is not None else width // 2 + rng.uniform(-200, 200)
+        self.y = height + 100
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+        self.speed = 2
+        self.angle = 0
+        self.radius = 150 * ENEMY_SCALE * 3
+        self.health = 100
+        self.max_health = 100
+
+        self.phases = phases
+        self.enter_phase(0, now)
+        self.flash_until = 0.0
+        self.flashing = False
+
+        self.color = ORANGE
+
+    def take_damage(self, now):
+        self.health -= 1
+        self.flash_until = now + BOSS_FLASH_TIME
+        self.flashing = True
+        return self.health <= 0
+
+    def update(self, player_x, player_y, delta_time):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        dx = player_x - self.x
+        dy = player_y - self.y
+        self.angle = math.degrees(math.atan2(dy, dx))
+
+        step = self.speed * delta_time * BASE_TICK_RATE
+        self.x += math.cos(math.radians(self.angle)) * step
+        self.y += math.sin(math.radians(self.angle)) * step
+
+    def enter_phase(self, phase, now):
+        self.phase = phase
+        patterns = self.phases[phase].patterns
+        self.volley_at = [now + pattern.delay for pattern in patterns]
+        self.volleys = [0] * len(patterns)
+
+    def current_phase(self):
+        phase = 0
+        for index, candidate in enumerate(self.phases):
+            if self.health <= candidate.health:
+                phase = index
+        return phase
+
+    def fire(self, i, store, now):
+        # pattern i's volley; returns when the next one is due
+        pattern = self.phases[self.phase].patterns[i]
+        pattern.emit(store, self.x, self.y, self.radius, self.angle, self.volleys[i])
+        self.volleys[i] += 1
+        self.volley_at[i] = now + pattern.every
+        return self.volley_at[i]
+
+
+class Bullet:
+    owner = OWNER_PLAYER
+
+    def __init__(self,x,y, angle):
+        self.x = x
+        self.y = y
+        self.angle = angle
+        self.speed = BULLET_SPEED
+        self.radius = BULLET_RADIUS
+        self.damage = 1
+        self.dx = math.cos(math.radians(angle)) * self.speed
+        self.dy = math.sin(math.radians(angle)) * self.speed
+
+
+class Inputs:
+    # one tick worth of player input; angle=None keeps the current aim
+    def __init__(self, up=False, down=False, left=False, right=False,
+                 shoot=False, angle=None):
+        self.up = up
+        self.down = down
+        self.left = left
+        self.right = right
+        self.shoot = shoot
+        self.angle = angle
+
+
+class World:
+    # all randomness goes through self.rng (and the particle pool's numpy
+    # generator, seeded from the same seed), so a seed plus the per-tick
+    # inputs reproduces a run exactly
+    mode = "classic"
+    timed_spawns = True     # one enemy every ENEMY_SPAWN_RATE when there's no timeline
+
+    def __init__(self, broadphase=BROADPHASE, seed=None, profiler=None,
+                 width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.width = width
+        self.height = height
+
+        self.player_x = width // 2
+        self.player_y = height // 2
+        self.player_angle = 0
+        self.player_radius = 150 * PLAYER_SCALE
+        self.prev_player_x = self.player_x
+        self.prev_player_y = self.player_y
+
+        self.boss = None
+        self.projectiles = ProjectileStore()
+        self.enemies = Registry()
+        self.swarm = None   # a SwarmStore in swarm mode
+        self.waves = None   # a waves.WaveScheduler replaces the spawn timer
+        self.timers = Scheduler()
+        self.shoot_ready_at = 0.0
+        self.next_spawn_at = 0.0
+        self.effects = {}
+        self.health = 100
+        self.game_over = False
+        self.score = 0
+
+        self.powerups = Registry()
+
+        self.broadphase = broadphase
+        self.grid = SpatialHash(BROADPHASE_CELL_SIZE)
+        self.view_index = SpatialHash(VIEW_CELL_SIZE)
+        self.particles = ParticlePool(speed=PARTICLE_SPEED, fade_rate=PARTICLE_FADE_RATE,
+                                      seed=seed)
+        self.profiler = profiler if profiler is not None else FrameProfiler()
+        # a telemetry.EventBus, or anything else with publish(); None costs
+        # one check per event. Publishing never feeds back into the game.
+        self.events = None
+        self.rebuild_timers()
+
+    # list views kept for drawing and older callers; they go stale as soon
+    # as the store compacts, so don't hold on to them across a step
+    @property
+    def bullets(self):
+        return self.projectiles.views(self.projectiles.owned_by(OWNER_PLAYER))
+
+    @property
+    def enemy_bullets(self):
+        return self.projectiles.views(self.projectiles.hostile())
+
+    def add_projectile(self, projectile):
+        self.projectiles.spawn(projectile.x, projectile.y,
+                               projectile.dx, projectile.dy,
+                               projectile.radius, projectile.damage,
+                               projectile.owner)
+
+    def step(self, delta_time, inputs):
+        prof = self.profiler
+        t = prof.mark()
+
+        self.timers.advance(delta_time)
+        if inputs.angle is not None:
+            self.player_angle = inputs.angle
+
+        if inputs.shoot:
+            self.shoot()
+
+        self.spawn_enemies(delta_time)
+
+        self.prev_player_x = self.player_x
+        self.prev_player_y = self.player_y
+        move = PLAYER_SPEED * delta_time * BASE_TICK_RATE
+        if inputs.up:
+            self.player_y += move
+        if inputs.down:
+            self.player_y -= move
+        if inputs.left:
+            self.player_x -= move
+        if inputs.right:
+            self.player_x += move
+
+        self.player_x = max(self.player_radius, min(
+            self.width - self.player_radius, self.player_x))
+        self.player_y = max(self.player_radius, min(
+            self.height - self.player_radius, self.player_y))
+        t = prof.lap("player", t)
+
+        # player, enemy and boss bullets all move and get culled together
+        self.update_projectiles(delta_time)
+        t = prof.lap("projectiles", t, self.projectiles.count)
+
+        self.update_enemies(delta_time)
+        t = prof.lap("enemies", t, self.enemy_count())
+
+        self.collide_bullets_enemies()
+        t = prof.lap("collisions", t, self.projectiles.count * self.enemy_count())
+
+        # with a wave timeline the boss only comes when the timeline says so
+        if self.waves is None and self.score >= BOSS_SCORE:
+            self.spawn_boss()
+
+        boss = self.boss
+        if boss:
+            boss.update(self.player_x, self.player_y, delta_time)
+            phase = boss.current_phase()
+            if phase != boss.phase:
+                boss.enter_phase(phase, self.timers.time)
+                self.schedule_volleys()
+
+        # boss ke sath bullet collison (isse if ke andar rakha he kiu ki crash na ho)
+        if self.boss:
+            self.collide_bullets_boss()
+        t = prof.lap("boss", t, 1 if self.boss else 0)
+
+        self.run_timers()
+        t = prof.lap("timers", t, len(self.timers))
+
+        # Powerup update and collision
+        if self.broadphase == "grid":
+            self.update_powerups_grid(delta_time)
+        else:
+            self.update_powerups_brute(delta_time)
+        t = prof.lap("powerups", t, len(self.powerups))
+
+        self.particles.update(delta_time * BASE_TICK_RATE)
+        # counting the live slots is a pass over the pool; skip it unprofiled
+        t = prof.lap("particles", t, self.particles.live_count() if prof.enabled else 0)
+
+        self.enemies.flush()
+        self.powerups.flush()
+        prof.lap("cleanup", t)
+
+    # The enemy phases of step() are methods so another game mode (see
+    # swarm.py) can swap in its own enemy storage.
+
+    def enemy_count(self):
+        return len(self.enemies)
+
+    def spawn_enemies(self, delta_time):
+        # without a wave timeline, enemies come from the TIMED_SPAWN event
+        if self.waves is not None:
+            self.waves.advance(self, delta_time)
+
+    def add_enemy(self, enemy):
+        # shooters fire as soon as they appear, then every ENEMY_SHOOT_COOLDOWN
+        self.enemies.add(enemy)
+        if enemy.enemy_type == "shooter":
+            enemy.shoot_at = self.timers.time
+            self.timers.at(enemy.shoot_at, ENEMY_SHOT, enemy.handle)
+
+    def spawn_batch(self, x, y, types, speed):
+        # a wave's worth of enemies at once; types index ENEMY_TYPES
+        rng = self.rng
+        for ex, ey, t, v in zip(x.tolist(), y.tolist(), types.tolist(), speed.tolist()):
+            self.add_enemy(Enemy(rng, ex, ey, ENEMY_TYPES[t], v))
+
+    def spawn_boss(self):
+        if self.boss is None:
+            self.set_boss(Boss(self.rng, width=self.width, height=self.height,
+                               now=self.timers.time))
+
+    def set_boss(self, boss):
+        self.boss = boss
+        self.schedule_volleys()
+        self.publish(EVENT_BOSS_SPAWN, boss.x, boss.y, boss.health)
+
+    def schedule_volleys(self):
+        boss = self.boss
+        for i, deadline in enumerate(boss.volley_at):
+            self.timers.at(deadline, BOSS_VOLLEY, (boss, boss.phase, i))
+
+    def start_effect(self, name, duration):
+        until = self.effects[name] = self.timers.time + duration
+        self.timers.at(until, EFFECT_END, name)
+
+    def hurt_player(self, amount):
+        if amount and "shield" not in self.effects:
+            self.health -= amount
+            self.publish(EVENT_DAMAGE, self.player_x, self.player_y, amount, self.health)
+
+    def add_score(self, points):
+        if points:
+            self.score += points
+            self.publish(EVENT_SCORE, self.player_x, self.player_y, points, self.score)
+
+    def publish(self, kind, x, y, amount=0, detail=0):
+        if self.events is not None:
+            self.events.publish(kind, self.timers.time, x, y, amount, detail)
+
+    # Timed events (see scheduler.py). Whatever came due this tick runs here,
+    # after everything has moved, in (deadline, kind, entity order) order so
+    # the outcome doesn't depend on when the events were pushed; an event
+    # whose owner has moved its deadline, or is gone, is dropped.
+
+    def run_timers(self):
+        timers = self.timers
+        while True:
+            due = timers.due()
+            if not due:
+                return
+            due.sort(key=self.timer_order)
+            for deadline, kind, target in due:
+                if kind == ENEMY_SHOT:
+                    self.enemy_shot(deadline, target)
+                elif kind == BOSS_VOLLEY:
+                    boss, phase, i = target
+                    if (boss is self.boss and boss.phase == phase and
+                            boss.volley_at[i] == deadline):
+                        timers.at(boss.fire(i, self.projectiles, timers.time), BOSS_VOLLEY,
+                                  target)
+                elif kind == BOSS_FLASH:
+                    if target is self.boss and target.flash_until == deadline:
+                        target.flashing = False
+                elif kind == EFFECT_END:
+                    if self.effects.get(target) == deadline:
+                        del self.effects[target]
+                elif kind == TIMED_SPAWN:
+                    if self.next_spawn_at == deadline and self.waves is None:
+                        self.add_enemy(Enemy(self.rng, width=self.width, height=self.height))
+                        self.next_spawn_at = timers.after(ENEMY_SPAWN_RATE, TIMED_SPAWN)
+
+    def timer_order(self, event):
+        deadline, kind, target = event
+        if kind == ENEMY_SHOT:
+            key = self.enemies.index_of(target)
+        elif kind == BOSS_VOLLEY:
+            key = target[2]
+        elif kind == EFFECT_END:
+            key = EFFECTS.index(target)
+        else:
+            key = 0
+        return deadline, kind, key
+
+    def enemy_shot(self, deadline, handle):
+        enemies = self.enemies
+        index = enemies.index_of(handle)
+        if index < 0 or enemies.dying[index]:
+            return
+        enemy = enemies.items[index]
+        if enemy.shoot_at != deadline:
+            return
+        # an enemy asleep far away skips the shot (it would be fired from
+        # a stale position) and tries again a full cooldown later
+        if enemy.lag == 0:
+            self.add_projectile(enemy.shoot())
+        enemy.shoot_at = self.timers.after(ENEMY_SHOOT_COOLDOWN, ENEMY_SHOT, handle)
+
+    def rebuild_timers(self):
+        # refills the heap from the deadlines everything holds
+        timers = self.timers
+        timers.clear()
+        if self.timed_spawns:
+            timers.at(self.next_spawn_at, TIMED_SPAWN)
+        for enemy in self.enemies:
+            if enemy.enemy_type == "shooter":
+                timers.at(enemy.shoot_at, ENEMY_SHOT, enemy.handle)
+        if self.boss is not None:
+            self.schedule_volleys()
+            if self.boss.flashing:
+                timers.at(self.boss.flash_until, BOSS_FLASH, self.boss)
+        for name, until in self.effects.items():
+            timers.at(until, EFFECT_END, name)
+
+    def update_enemies(self, delta_time):
+        # Enemy update and shooting. Removals are queued and flushed at the
+        # end of the tick, so later passes skip anything marked dying.
+        player_x = self.player_x
+        player_y = self.player_y
+        view_index = self.view_index
+        view_index.clear()
+        for enemy in self.enemies:
+            lag = enemy.lag + delta_time
+            if lag < SLEEP_STEP and (abs(enemy.x - player_x) > AWAKE_WIDTH or
+                                     abs(enemy.y - player_y) > AWAKE_HEIGHT):
+                # asleep: stands still this tick
+                enemy.lag = lag
+                enemy.prev_x = enemy.x
+                enemy.prev_y = enemy.y
+                continue
+            enemy.lag = 0.0
+            enemy.update(player_x, player_y, lag)
+            view_index.insert(enemy, enemy.x, enemy.y)
+
+            # Player vs Enemy collision
+            distance = math.hypot(enemy.x - self.player_x, enemy.y - self.player_y)
+
+            if distance < enemy.radius + self.player_radius:
+                self.hurt_player(10)
+                self.enemies.destroy(enemy.handle)
+                if self.health <= 0:
+                    self.game_over = True
+
+            elif enemy.is_off_screen(self.width, self.height):
+                self.enemies.destroy(enemy.handle)
+
+    def visible_enemies(self, left, bottom, right, top):
+        # enemies whose centre may be inside the rectangle, from the index
+        # built by the last update_enemies(); callers still cull exactly
+        enemies = self.enemies
+        return [enemy for enemy in self.view_index.query_rect(left, bottom, right, top)
+                if enemies.is_alive(enemy.handle)]
+
+    def collide_bullets_enemies(self):
+        if self.broadphase == "grid":
+            self.collide_bullets_enemies_grid()
+        else:
+            self.collide_bullets_enemies_brute()
+
+    def update_projectiles(self, delta_time):
+        store = self.projectiles
+        store.advance(delta_time * BASE_TICK_RATE)
+
+        n = store.count
+        x = store.x[:n]
+        y = store.y[:n]
+        mine = store.owner[:n] == OWNER_PLAYER
+        vy = store.vy[:n]
+        off_x = (x < 0) | (x > self.width)
+        off_y = (y < 0) | (y > self.height)
+        leaving_y = ((y < 0) & (vy < 0)) | ((y > self.height) & (vy > 0))
+
+        # enemy and boss bullets only hit the player; they are culled on x,
+        # and on y only once heading away, so shots fired from above or
+        # below the screen still arrive (and a boss ring's far half doesn't
+        # live forever)
+        dead = off_x | np.where(mine, off_y, leaving_y)
+        hits, _ = store.sweep(self.prev_player_x, self.prev_player_y,
+                              self.player_x, self.player_y, self.player_radius, ~mine)
+        self.hurt_player(int(store.damage[hits].sum()))
+        dead[hits] = True
+
+        store.keep(~dead)
+
+    # Bullets are tested along their whole path this step against each
+    # enemy's path (see sweep.py); a bullet hits the enemy it touches first,
+    # ties going to the earlier enemy in list order.
+
+    def collide_bullets_enemies_brute(self):
+        store = self.projectiles
+        xs = store.x.tolist()
+        ys = store.y.tolist()
+        pxs = store.prev_x.tolist()
+        pys = store.prev_y.tolist()
+        radii = store.radius.tolist()
+        spent = []
+        enemies = self.enemies
+        dying = enemies.dying
+        for i in store.owned_by(OWNER_PLAYER).tolist():
+            first = None
+            first_t = 2
+            for index, enemy in enumerate(enemies.items):
+                if dying[index]:
+                    continue
+                t = contact_time(pxs[i] - enemy.prev_x, pys[i] - enemy.prev_y,
+                                 xs[i] - enemy.x, ys[i] - enemy.y, radii[i] + enemy.radius)
+                if t is not None and t < first_t:
+                    first = index
+                    first_t = t
+            if first is None:
+                continue
+
+            enemy = enemies.items[first]
+            #Enemy called remove ki jagha pe take_damage() call kia he
+            killed = enemy.take_damage()
+            self.particles.emit(enemy.x, enemy.y,
+                                PARTICLE_KILL_COUNT if killed else PARTICLE_COUNT)
+            if killed:
+                enemies.destroy(enemy.handle)
+                self.publish(EVENT_KILL, enemy.x, enemy.y, 10,
+                             ENEMY_TYPES.index(enemy.enemy_type))
+                self.add_score(10)
+
+                # Spawn powerup logic
+            if self.rng.random() < POWERUP_DROP_CHANCE:
+                power_type = self.rng.choice(POWERUP_TYPES)
+                self.powerups.add(PowerUp(enemy.x, enemy.y, power_type))
+
+            spent.append(i)
+        store.remove(spent)
+
+    def collide_bullets_enemies_grid(self):
+        if not self.enemies:
+            return
+        enemies = self.enemies
+        dying = enemies.dying
+        grid = self.grid
+        grid.clear()
+        # an enemy is filed where it ended the step, with its radius grown by
+        # how far it moved, so a query along a bullet's path still reaches it
+        for index, enemy in enumerate(enemies.items):
+            if not dying[index]:
+                moved = math.hypot(enemy.x - enemy.prev_x, enemy.y - enemy.prev_y)
+                grid.insert(index, enemy.x, enemy.y, enemy.radius + moved)
+
+        store = self.projectiles
+        xs = store.x.tolist()
+        ys = store.y.tolist()
+        pxs = store.prev_x.tolist()
+        pys = store.prev_y.tolist()
+        radii = store.radius.tolist()
+        spent = []
+        for i in store.owned_by(OWNER_PLAYER).tolist():
+            bx = xs[i]
+            by = ys[i]
+            px = pxs[i]
+            py = pys[i]
+            br = radii[i]
+            # query a circle around the whole path
+            half = math.hypot(bx - px, by - py) / 2
+            first = None
+            first_t = 2
+            for index in grid.query((px + bx) / 2, (py + by) / 2, half + br):
+                if dying[index]:
+                    continue
+                enemy = enemies.items[index]
+                t = contact_time(px - enemy.prev_x, py - enemy.prev_y,
+                                 bx - enemy.x, by - enemy.y, br + enemy.radius)
+                if t is not None and (t < first_t or (t == first_t and index < first)):
+                    first = index
+                    first_t = t
+            if first is None:
+                continue
+
+            enemy = enemies.items[first]
+            killed = enemy.take_damage()
+            self.particles.emit(enemy.x, enemy.y,
+                                PARTICLE_KILL_COUNT if killed else PARTICLE_COUNT)
+            if killed:
+                enemies.destroy(enemy.handle)
+                self.publish(EVENT_KILL, enemy.x, enemy.y, 10,
+                             ENEMY_TYPES.index(enemy.enemy_type))
+                self.add_score(10)
+
+            if self.rng.random() < POWERUP_DROP_CHANCE:
+                power_type = self.rng.choice(POWERUP_TYPES)
+                self.powerups.add(PowerUp(enemy.x, enemy.y, power_type))
+
+            spent.append(i)
+
+        store.remove(spent)
+
+    def collide_bullets_boss(self):
+        # only the first player bullet to reach the boss counts each tick
+        store = self.projectiles
+        boss = self.boss
+        mine = store.owner[:store.count] == OWNER_PLAYER
+        hit, t = store.sweep(boss.prev_x, boss.prev_y, boss.x, boss.y, boss.radius, mine)
+        if len(hit) == 0:
+            return
+
+        killed = boss.take_damage(self.timers.time)
+        self.timers.at(boss.flash_until, BOSS_FLASH, boss)
+        self.particles.emit(boss.x, boss.y,
+                            PARTICLE_BOSS_KILL_COUNT if killed else PARTICLE_COUNT)
+        if killed:
+            self.boss = None #boss is dead
+            self.publish(EVENT_BOSS_KILL, boss.x, boss.y, 500)
+            self.add_score(500)
+        store.remove([hit[np.argmin(t)]])
+
+    def update_powerups_brute(self, delta_time):
+        for powerup in self.powerups:
+            powerup.update(delta_time)
+
+            # Remove if off screen
+            if powerup.y < -50:
+                self.powerups.destroy(powerup.handle)
+                continue
+
+            # Player collision
+            distance = math.hypot(powerup.x - self.player_x, powerup.y - self.player_y)
+            if distance < powerup.radius + self.player_radius:
+                self.collect_powerup(powerup)
+                self.powerups.destroy(powerup.handle)
+
+    def update_powerups_grid(self, delta_time):
+        grid = self.grid
+        grid.clear()
+        for index, powerup in enumerate(self.powerups.items):
+            powerup.update(delta_time)
+            # Remove if off screen
+            if powerup.y < -50:
+                self.powerups.destroy(powerup.handle)
+                continue
+            grid.insert(index, powerup.x, powerup.y, powerup.radius)
+
+        taken = []
+        for index in grid.query(self.player_x, self.player_y, self.player_radius):
+            powerup = self.powerups.items[index]
+            distance = math.hypot(powerup.x - self.player_x, powerup.y - self.player_y)
+            if distance < powerup.radius + self.player_radius:
+                taken.append(index)
+
+        # apply pickups in registry order, same as the brute loop
+        for index in sorted(taken):
+            powerup = self.powerups.items[index]
+            self.collect_powerup(powerup)
+            self.powerups.destroy(powerup.handle)
+
+    def collect_powerup(self, powerup):
+        self.publish(EVENT_POWERUP, powerup.x, powerup.y, 0,
+                     POWERUP_TYPES.index(powerup.type))
+        if powerup.type == "rapid_fire":
+            self.start_effect("rapid_fire", RAPID_FIRE_DURATION)
+        elif powerup.type == "shield":
+            self.start_effect("shield", SHIELD_DURATION) # no damage while it lasts
+        elif powerup.type == "health":
+            self.health = min(100, self.health + 50) # Heal 50
+
+    def shoot(self):
+        # the trigger is only checked when pulled, so it is a plain deadline
+        # rather than a timer event
+        if self.timers.time >= self.shoot_ready_at:
+            bullet_x = self.player_x + \
+                math.cos(math.radians(self.player_angle)) * self.player_radius
+            bullet_y = self.player_y + \
+                math.sin(math.radians(self.player_angle)) * self.player_radius
+            self.add_projectile(Bullet(bullet_x, bullet_y, self.player_angle))
+
+            # Apply rapid fire effect
+            cooldown = PLAYER_SHOOT_COOLDOWN
+            if "rapid_fire" in self.effects:
+                cooldown /= 4 # 4x faster firing speed
+
+            self.shoot_ready_at = self.timers.time + cooldown
+
+    def restart(self):
+        self.player_x = self.width // 2
+        self.player_y = self.height // 2
+        self.prev_player_x = self.player_x
+        self.prev_player_y = self.player_y
+        self.player_angle = 0
+        self.projectiles.clear()
+        self.particles.clear()
+        self.enemies.clear()
+        self.view_index.clear()
+        self.powerups.clear()
+        self.boss = None
+        self.effects.clear()
+        self.timers.reset()
+        self.shoot_ready_at = 0.0
+        self.next_spawn_at = 0.0
+        self.rebuild_timers()
+        if self.waves is not None:
+            self.waves.reset()
+        self.score = 0
+        self.health = 100
+        self.game_over = False
+        self.publish(EVENT_RESTART, self.player_x, self.player_y)